@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*- 
+
+'''
+    Benchmark of the vectorised 'matching_standard' of ProcessSinan_v2 and ProcessSivep_v2 
+    against the previous row-wise implementation (kept below as reference). The outputs of
+    both implementations are checked to be identical before timing. The normalisation caches
+    are emptied before each vectorised run, so every case is timed with a cold cache.
+
+    Usage (from the root of the repository):
+        python benchmarks/bench_matching_standard.py [number of rows]
+'''
+
+import os
+import re
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# --> The package is not installed: import it from the root of the repository.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import linkage_saude.utils.general as general_utils
+from linkage_saude.transform.ProcessSus import ProcessSinan_v2, ProcessSivep_v2
+
+# --> Reference (row-wise) implementation.
+def name_standard(col):
+    return col.apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan).apply(lambda x: re.sub(' {2,}', ' ', x) if pd.notna(x) else np.nan)
+
+def name_parts(data, sific=False):
+    data["FONETICA_N"] = data["nome"].apply(lambda x: f"{x.split(' ')[0]}{x.split(' ')[-1]}" if pd.notna(x) else np.nan)
+    if sific:
+        data["FONETICA_N"] = data["nome_mae"].apply(lambda x: f"{x.split(' ')[0]}{x.split(' ')[-1]}" if pd.notna(x) else np.nan)
+        data["classif_nascido"] = data[["nome", "nome_mae"]].apply(lambda x: x["nome"].replace(x["nome_mae"], '') if pd.notna(x["nome"]) and pd.notna(x["nome_mae"]) and x["nome_mae"] in x["nome"] else x["nome"], axis=1) 
+        data["classif_nascido"] = data["classif_nascido"].apply(lambda x: x.strip().replace(" DE", ""))
+
+    data["nascimento_dia"] = data["dt_nasc"].apply(lambda x: x.day if hasattr(x, 'day') and pd.notna(x) else np.nan)
+    data["nascimento_mes"] = data["dt_nasc"].apply(lambda x: x.month if hasattr(x, 'day') and pd.notna(x) else np.nan)
+    data["nascimento_ano"] = data["dt_nasc"].apply(lambda x: x.year if hasattr(x, 'day') and pd.notna(x) else np.nan)
+
+    data["primeiro_nome"] = data["nome"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
+    data["complemento_nome"] = data["nome"].apply(lambda x: ' '.join(x.split(" ")[1:]) if pd.notna(x) and len(x.split(" "))>1 else np.nan )
+    if sific:
+        data["primeiro_nome"] = data["classif_nascido"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
+        data["complemento_nome"] = data["classif_nascido"].apply(lambda x: ' '.join(x.split(" ")[2:]) if pd.notna(x) and len(x.split(" "))>2 else np.nan )
+    
+    data["primeiro_nome_mae"] = data["nome_mae"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
+    data["segundo_nome_mae"] = data["nome_mae"].apply(lambda x: x.split(" ")[1] if pd.notna(x) and len(x.split(" "))>1 else np.nan )
+    data["complemento_nome_mae"] = data["nome_mae"].apply(lambda x: ' '.join(x.split(" ")[2:]) if pd.notna(x) and len(x.split(" "))>2 else np.nan )
+
+def reference_sinan(raw, sific=False):
+    data = pd.DataFrame(index=raw.index)
+    data["nome"] = name_standard(raw["NM_PACIENT"])
+    data["nome_mae"] = name_standard(raw["NM_MAE_PAC"])
+    data["sexo"] = raw["CS_SEXO"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan)
+    data["dt_nasc"] = raw["DT_NASC"].apply(lambda x: pd.to_datetime(x, format="%d/%m/%Y", errors="coerce") if not hasattr(x, 'year') and pd.notna(x) else x)
+    data["cns"] = raw["ID_CNS_SUS"].apply(lambda x: x if isinstance(x, str) and general_utils.cns_is_valid(x) and pd.notna(x) else ( f"{x:13.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else np.nan))
+    data["cep"] = raw["NU_CEP"].apply(lambda x: x if pd.notna(x) else np.nan)
+    data["bairro"] = raw["NM_BAIRRO"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan)
+    data["cod_unidade"] = raw["ID_UNIDADE"].apply(lambda x: x if pd.notna(x) else np.nan)
+    name_parts(data, sific)
+    return data
+
+def reference_sivep(raw):
+    data = pd.DataFrame(index=raw.index)
+    data["nome"] = name_standard(raw["NM_PACIENT"])
+    data["nome_mae"] = name_standard(raw["NM_MAE_PAC"])
+    data["sexo"] = raw["CS_SEXO"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan)
+    data["dt_nasc"] = raw["DT_NASC"].apply(lambda x: pd.to_datetime(x, format="%d/%m/%Y", errors="coerce") if not hasattr(x, 'year') and pd.notna(x) else x)
+    data["cpf"] = raw["NU_CPF"].apply(lambda x: f"{x:11.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else x)
+    data["cns"] = raw["NU_CNS"].apply(lambda x: x if isinstance(x, str) and general_utils.cns_is_valid(x) and pd.notna(x) else ( f"{x:13.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else np.nan))
+    data["cep"] = raw["NU_CEP"].apply(lambda x: x if isinstance(x, str) and pd.notna(x) else ( f"{x:8.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else np.nan))
+    data["bairro"] = raw["NM_BAIRRO"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan)
+    data["cod_unidade"] = raw["CO_UNI_NOT"].apply(lambda x: x if pd.notna(x) else np.nan)
+    name_parts(data)
+    return data
+
+# --> Synthetic raw data.
+def synthetic_raw(n, seed=0):
+    rng = np.random.default_rng(seed)
+    first = ["MARIA", "josé", "João", "ANA", "Francisco", "antônio", "D'ÁVILA", "Conceição", "LUÍS"]
+    last = ["DA SILVA", "santos", "Oliveira", "SOUZA  LIMA", "Pereira-Costa", "DE JESUS", "ALVES.", "Nº 2", "ÇÃO"]
+    names = np.char.add(np.char.add(rng.choice(first, n), rng.choice([" ", "  ", " ."], n)), rng.choice(last, n)).astype(object)
+    names[rng.random(n)<0.05] = np.nan
+    mothers = np.char.add(np.char.add(rng.choice(first, n), " "), rng.choice(last, n)).astype(object)
+    mothers[rng.random(n)<0.05] = None
+    # --> Newborns of congenital syphilis are registered with the name of the mother.
+    newborn = rng.random(n)<0.1
+    names[newborn] = np.char.add("RN DE ", mothers[newborn].astype(str)).astype(object)
+
+    dates = pd.Series(pd.Timestamp("1950-01-01")+pd.to_timedelta(rng.integers(0, 25000, n), "D")).dt.strftime("%d/%m/%Y").to_numpy(dtype=object)
+    dates[rng.random(n)<0.03] = "31/02/2001"
+    dates[rng.random(n)<0.05] = np.nan
+
+    cns_valid = np.array(["898001160626004", "700000000000005", "123456789012345"], dtype=object)
+    cns = rng.choice(cns_valid, n).astype(object)
+    numeric_cns = rng.random(n)<0.3
+    cns[numeric_cns] = rng.integers(10**11, 10**14, numeric_cns.sum()).astype(float)
+    cns[rng.random(n)<0.2] = np.nan
+
+    cpf = rng.integers(10**8, 10**11, n).astype(float).astype(object)
+    as_string = rng.random(n)<0.3
+    cpf[as_string] = [ f"{x:011.0f}" for x in cpf[as_string] ]
+    cpf[rng.random(n)<0.2] = None
+
+    cep = rng.integers(60000000, 63999999, n).astype(float).astype(object)
+    cep[rng.random(n)<0.4] = "60000000"
+    cep[rng.random(n)<0.1] = np.nan
+
+    bairros = np.array(["CENTRO", "Aldeota", "Messejana ", "  jóquei clube", "BOM JARDIM", np.nan], dtype=object)
+    raw = pd.DataFrame({
+        "NM_PACIENT": names, "NM_MAE_PAC": mothers, 
+        "CS_SEXO": rng.choice(np.array(["m", "F ", "I", np.nan], dtype=object), n),
+        "DT_NASC": dates, "ID_CNS_SUS": cns, "NU_CNS": cns, "NU_CPF": cpf, "NU_CEP": cep,
+        "NM_BAIRRO": rng.choice(bairros, n),
+        "ID_UNIDADE": rng.choice(np.array([2481286.0, 2528916.0, np.nan]), n),
+        "CO_UNI_NOT": rng.choice(np.array(["2481286", "2528916", None], dtype=object), n),
+    })
+    return raw
+
+def run(process_class, raw, **kwargs):
+    data_object = SimpleNamespace(has_id=True, validated=True, _raw_data=raw, _data=pd.DataFrame(index=raw.index))
+    processing = process_class(data_object)
+    processing.matching_standard(**kwargs)
+    return processing.data
+
+if __name__=="__main__":
+    n = int(sys.argv[1]) if len(sys.argv)>1 else 100000
+    raw = synthetic_raw(n)
+    # --> The row-wise 'sific' standardization requires the names of all records.
+    raw_sific = raw.dropna(subset=["NM_PACIENT"])
+
+    cases = [
+        ("SINAN", lambda: reference_sinan(raw), lambda: run(ProcessSinan_v2, raw)),
+        ("SINAN (sific)", lambda: reference_sinan(raw_sific, sific=True), lambda: run(ProcessSinan_v2, raw_sific, sific=True)),
+        ("SIVEP", lambda: reference_sivep(raw), lambda: run(ProcessSivep_v2, raw)),
+    ]
+    for name, reference, vectorised in cases:
+        start = time.perf_counter()
+        expected = reference()
+        t_reference = time.perf_counter()-start
+
+        general_utils.clear_normalisation_caches()
+        start = time.perf_counter()
+        result = vectorised()
+        t_vectorised = time.perf_counter()-start
+
+        # --> Same values and same order of the columns.
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"{name:<15} rows: {n:>9}  row-wise: {t_reference:8.2f}s  vectorised: {t_vectorised:8.2f}s  speed-up: {t_reference/t_vectorised:6.1f}x")
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*- 
+
+'''
+    Persistent and incremental grouping of the records matched by the deduplication.
+
+    Author: Higor S. Monteiro
+    Email: higormonteiros@gmail.com
+'''
+
+import os
+import numpy as np
+import pandas as pd
+
+from linkage_saude.exceptions import *
+import linkage_saude.utils.matching as matching_utils
+
+
+class ClusterStore:
+    '''
+        Union-find state of the deduplication (parent and size arrays, plus the mapping of
+        the record IDs to their positions) persisted inside the working folder. New matched 
+        pairs are merged into the existing groups, so each refresh costs time proportional 
+        to the new pairs instead of the whole history of pairs.
+
+        Args:
+        -----
+            env_folder:
+                String. Working folder. The state is stored in 'env_folder/cluster_store'.
+    '''
+
+    def __init__(self, env_folder) -> None:
+        if env_folder is None:
+            raise OutputPathMissing("No working folder was provided.")
+
+        self.store_folder = os.path.join(env_folder, "cluster_store")
+        if not os.path.isdir(env_folder):
+            os.mkdir(env_folder)
+        if not os.path.isdir(self.store_folder):
+            os.mkdir(self.store_folder)
+
+        # --> Load existing state, if the case.
+        self._ids = pd.Index([])
+        self._parent = np.zeros(0, dtype=np.int64)
+        self._size = np.zeros(0, dtype=np.int64)
+        if os.path.isfile(os.path.join(self.store_folder, "parent.npy")):
+            self._ids = pd.Index(pd.read_parquet(os.path.join(self.store_folder, "ids.parquet"))["ID"])
+            self._parent = np.load(os.path.join(self.store_folder, "parent.npy"))
+            self._size = np.load(os.path.join(self.store_folder, "size.npy"))
+
+    @property
+    def ids(self):
+        return self._ids
+
+    @ids.setter
+    def ids(self, x):
+        raise AttributeError("Not possible to change this attribute.")
+
+    def _positions(self, ids):
+        '''
+            Positions of the IDs in the union-find arrays. Unknown IDs are appended as new groups.
+        '''
+        positions = self._ids.get_indexer(ids)
+        new_ids = pd.unique(np.asarray(ids)[positions==-1])
+        if len(new_ids):
+            first = self._ids.shape[0]
+            self._ids = self._ids.append(pd.Index(new_ids))
+            self._parent = np.concatenate([self._parent, np.arange(first, first+len(new_ids))])
+            self._size = np.concatenate([self._size, np.ones(len(new_ids), dtype=np.int64)])
+            positions = self._ids.get_indexer(ids)
+        return positions
+
+    def _find(self, positions):
+        '''
+            Roots of the given positions (vectorised find). The paths of the queried positions 
+            are compressed.
+        '''
+        roots = self._parent[positions]
+        while True:
+            parents = self._parent[roots]
+            if (parents==roots).all():
+                break
+            roots = parents
+        self._parent[positions] = roots
+        return roots
+
+    def update(self, pairs, save=True):
+        '''
+            Merge new matched pairs into the groups. Only the groups touched by the pairs are modified.
+
+            Args:
+            -----
+                pairs:
+                    pandas.DataFrame. A dataframe containing at least two columns representing
+                    the matched pairs of unique records: "left_id" and "right_id".
+                save:
+                    Boolean. Default True. Persist the updated state in the working folder.
+            Return:
+            -------
+                self.
+        '''
+        left_roots = self._find(self._positions(pairs["left_id"].to_numpy()))
+        right_roots = self._find(self._positions(pairs["right_id"].to_numpy()))
+        linked = left_roots!=right_roots
+
+        if linked.any():
+            # --> Components of the graph of the roots touched by the new pairs.
+            roots, labels = matching_utils.connected_components(left_roots[linked], right_roots[linked])
+            roots = roots.astype(np.int64)
+
+            # --> Union by size: the largest group of each component becomes the new root.
+            order = np.lexsort((-self._size[roots], labels))
+            first = np.unique(labels[order], return_index=True)[1]
+            new_root = np.zeros(roots.shape[0], dtype=np.int64)
+            new_root[labels[order][first]] = roots[order][first]
+
+            group_size = np.bincount(labels, weights=self._size[roots]).astype(np.int64)
+            self._parent[roots] = new_root[labels]
+            self._size[new_root[labels]] = group_size[labels]
+
+        if save:
+            self.save()
+        return self
+
+    def save(self):
+        '''
+            Persist the union-find state in the working folder.
+        '''
+        pd.DataFrame({"ID": self._ids}).to_parquet(os.path.join(self.store_folder, "ids.parquet"))
+        np.save(os.path.join(self.store_folder, "parent.npy"), self._parent)
+        np.save(os.path.join(self.store_folder, "size.npy"), self._size)
+        return self
+
+    def labels(self):
+        '''
+            Cluster label of every record of the store.
+
+            Return:
+            -------
+                ids:
+                    numpy.array. IDs of the records.
+                roots:
+                    numpy.array. ID of the root of the group of each record.
+        '''
+        roots = self._find(np.arange(self._ids.shape[0]))
+        ids = self._ids.to_numpy()
+        return ids, ids[roots]
+
+    def grouping(self):
+        '''
+            Same layout of 'matching_utils.deduple_grouping': the root of each group associated 
+            to the list of the other records of the group. Groups have the same members, but are
+            keyed by the root of the union by size, which may differ from the key chosen by
+            'deduple_grouping' (first ID appearing in the pairs).
+
+            Return:
+            -------
+                matched_records:
+                    collections.defaultdict.
+        '''
+        roots = self._find(np.arange(self._ids.shape[0]))
+        return matching_utils.grouping_view(self._ids.to_numpy(), roots)
@@ -2,12 +2,18 @@
 
 
 import os
+import time
 import ujson as json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import recordlinkage
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from linkage_saude.exceptions import *
+import linkage_saude.utils.general as general_utils
 import linkage_saude.utils.matching as matching_utils
 
 class MatchingBase:
@@ -27,12 +33,25 @@ class MatchingBase:
                 String.
             env_folder:
                 String.
+            left_id_map:
+                pandas.DataFrame. Default None. When 'left_id' is an integer surrogate key 
+                ('SURROGATE_ID'), the mapping table to the original IDs (the 'id_map' of the 
+                data object). Original IDs are restored only at the output (see 'original_ids').
+            right_id_map:
+                pandas.DataFrame. Default None. Same as 'left_id_map' for the right database.
     '''
 
-    def __init__(self, left_df, right_df=None, left_id=None, right_id=None, env_folder=None) -> None:
+    def __init__(self, left_df, right_df=None, left_id=None, right_id=None, env_folder=None, 
+                 left_id_map=None, right_id_map=None) -> None:
         self._comparison_matrix = None
         self.linkage_vars = None
         self.compare_cl, self._comparison_matrix = None, None
+        self._cascade = None
+        self._threshold = None
+        self._compact, self._string_vars = None, []
+        self._record_store = None
+        self._exact_pairs = None
+        self._left_unresolved, self._right_unresolved = None, None
 
         # --> solve for the left dataframe
         self.left_df, self.left_id = left_df.copy(), left_id
@@ -48,6 +67,11 @@ class MatchingBase:
                 raise Exception("Must provide an existing field as a unique identifier.")
             self.right_df = self.right_df.set_index(self.right_id)
             
+        # --> translation of integer surrogate keys, if the case
+        self.left_id_map, self.right_id_map = left_id_map, right_id_map
+        if self.right_df is None:
+            self.right_id_map = left_id_map
+
         # --> select working folder
         self.env_folder = env_folder
         if self.env_folder is not None and not os.path.isdir(self.env_folder):
@@ -61,13 +85,21 @@ class MatchingBase:
     @comparison_matrix.setter
     def comparison_matrix(self):
         raise Exception("Not possible to change this attribute from outside.")
+
+    @property
+    def exact_pairs(self):
+        return self._exact_pairs
+
+    @exact_pairs.setter
+    def exact_pairs(self, x):
+        raise Exception("Not possible to change this attribute from outside.")
     
     '''
         -------------------------------------------
         ------------ MATCHING SETTINGS ------------
         -------------------------------------------
     '''
-    def set_linkage(self, compare_rules, string_method="damerau_levenshtein"):
+    def set_linkage(self, compare_rules, string_method="damerau_levenshtein", cascade_score=None):
         '''
             Description.
 
@@ -83,33 +115,381 @@ class MatchingBase:
                 **kwargs:
                     Aside from the 'threshold' argument, arguments are the same as the comparison
                     methods from recordlinkage.Compare class. 
+                cascade_score:
+                    Float. Default None. Minimum score (sum of the field scores) of a potential match.
+                    When provided, the comparison is cascaded: the 'exact' rules are computed first and
+                    pairs that cannot reach 'cascade_score', even with full score on every 'string' rule, 
+                    are dropped before any string similarity is computed.
             Return:
                 None.
         '''
         self.linkage_vars = list(compare_rules.keys())
+        self._string_vars = [ key for key, values in compare_rules.items() if values[0]=="string" ]
 
         # -- settings for comparison between fields
         self.compare_cl = recordlinkage.Compare()
+        compare_exact, compare_string = recordlinkage.Compare(), recordlinkage.Compare()
         for key, values in compare_rules.items():
             if values[0]=="exact":
                 self.compare_cl.exact(key, key, label=key)
+                compare_exact.exact(key, key, label=key)
             elif values[0]=="string":
                 self.compare_cl.string(key, key, label=key, threshold=values[1], method=string_method)
+                compare_string.string(key, key, label=key, threshold=values[1], method=string_method)
             else:
                 pass
+
+        # -- cascade only makes sense when both kinds of rules exist
+        self._cascade = None
+        if cascade_score is not None and len(compare_exact.features) and len(compare_string.features):
+            self._cascade = {"exact": compare_exact, "string": compare_string, "n_string": len(compare_string.features),
+                             "min_score": cascade_score, "labels": [ key for key, values in compare_rules.items() if values[0] in ("exact", "string") ]}
+        return self
+
+    def exact_prepass(self, keys=["cns", "cpf"]):
+        '''
+            Deterministic first stage of the matching: records sharing a valid document 
+            identifier (CNS, CPF) are linked through a hash-join and accepted outright 
+            (see 'exact_pairs'). Resolved records are removed from the probabilistic stage 
+            ('perform_linkage'). For deduplication, the first record of each group is kept 
+            as its representative, so the group can still be matched to other records.
+
+            Args:
+            -----
+                keys:
+                    List. Default ["cns", "cpf"]. Identifier fields used for the hash-join. 
+                    'cns' and 'cpf' values are validated by their check digits, other fields
+                    only need to be filled. Fields absent in the databases are ignored.
+            Return:
+            -------
+                self.
+        '''
+        validators = {"cns": general_utils.cns_valid_mask, "cpf": general_utils.cpf_valid_mask}
+
+        exact_pairs, resolved_left, resolved_right = [], pd.Index([]), pd.Index([])
+        for key in keys:
+            if key not in self.left_df.columns or (self.right_df is not None and key not in self.right_df.columns):
+                continue
+            left_keys = matching_utils.valid_keys(self.left_df[key], validators.get(key))
+            right_keys = None
+            if self.right_df is not None:
+                right_keys = matching_utils.valid_keys(self.right_df[key], validators.get(key))
+
+            pairs, key_left, key_right = matching_utils.exact_key_pairs(left_keys, right_keys)
+            exact_pairs.append(pairs)
+            resolved_left = resolved_left.union(key_left)
+            if key_right is not None:
+                resolved_right = resolved_right.union(key_right)
+
+        self._exact_pairs = pd.DataFrame(columns=["left_id", "right_id"])
+        if len(exact_pairs):
+            self._exact_pairs = pd.concat(exact_pairs).drop_duplicates(ignore_index=True)
+        print(f"Number of exact pairs: {self._exact_pairs.shape[0]}")
+
+        # --> Records left for the probabilistic stage.
+        self._left_unresolved = np.flatnonzero(~self.left_df.index.isin(resolved_left))
+        if self.right_df is not None:
+            self._right_unresolved = np.flatnonzero(~self.right_df.index.isin(resolved_right))
         return self
 
     def perform_linkage(self):
         return self
 
+    def export_record_store(self, columns=None):
+        '''
+            Export the columns needed by the linkage into memory-mapped Arrow IPC files inside
+            the working folder ('record_store/'). When comparing in parallel ('n_jobs' argument of 
+            'perform_linkage'), workers attach to these files zero-copy and read only the records
+            of their own partition, instead of receiving a pickled copy of the DataFrames.
+
+            Args:
+            -----
+                columns:
+                    List. Default None. Columns to be exported. When None, the linkage 
+                    variables defined in 'set_linkage' are used.
+            Return:
+            -------
+                self.
+        '''
+        if self.env_folder is None:
+            raise OutputPathMissing("No working folder was provided.")
+        if columns is None:
+            if self.linkage_vars is None:
+                raise Exception("Linkage rules must be set before exporting the record store.")
+            columns = self.linkage_vars
+
+        store_folder = os.path.join(self.env_folder, "record_store")
+        if not os.path.isdir(store_folder):
+            os.mkdir(store_folder)
+
+        self._record_store = {"left": os.path.join(store_folder, "left.arrow"), "right": None}
+        matching_utils.write_record_store(self.left_df, columns, self._record_store["left"])
+        if self.right_df is not None:
+            self._record_store["right"] = os.path.join(store_folder, "right.arrow")
+            matching_utils.write_record_store(self.right_df, columns, self._record_store["right"])
+        return self
+
+    def _compute_features(self, candidate_links, left_df, right_df=None):
+        '''
+            Compute the comparison features of the candidate pairs according to the rules
+            defined in 'set_linkage'.
+
+            Args:
+            -----
+                candidate_links:
+                    pandas.MultiIndex. Pairs of records to be compared.
+                left_df:
+                    pandas.DataFrame.
+                right_df:
+                    pandas.DataFrame. Default None (deduplication).
+            Return:
+            -------
+                features:
+                    pandas.DataFrame. Comparison matrix of the candidate pairs.
+        '''
+        return matching_utils.compute_features(self.compare_cl, candidate_links, left_df, right_df, self._cascade)
+
+    def _compute_partitions(self, partitions, n_jobs=None):
+        '''
+            Compute the comparison features of each partition of candidate pairs. When 'n_jobs'
+            is larger than one, partitions are dispatched to a pool of 'n_jobs' processes, each
+            worker receiving only the records of its own partition (or attaching to the record
+            store, see 'export_record_store'). Results are yielded in the same order of the 
+            partitions and at most 2*n_jobs partitions are in flight.
+
+            Args:
+            -----
+                partitions:
+                    Iterable of 3-tuples. (candidate_links, left_positions, right_positions) as
+                    generated by 'matching_utils.partitioned_candidates'.
+                n_jobs:
+                    Integer. Default None. Number of worker processes.
+            Return:
+            -------
+                generator of pandas.DataFrame.
+        '''
+        if n_jobs is None or n_jobs<=1:
+            for candidate_links, left_positions, right_positions in partitions:
+                left_positions, right_positions = self._unresolved_positions(left_positions, right_positions)
+                left_chunk, right_chunk = self._partition_records(left_positions, right_positions)
+                yield self._compact_features(self._compute_features(candidate_links, left_chunk, right_chunk))
+            return
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            pending = deque()
+            for candidate_links, left_positions, right_positions in partitions:
+                left_positions, right_positions = self._unresolved_positions(left_positions, right_positions)
+                if self._record_store is not None:
+                    # --> Workers attach to the memory-mapped record store.
+                    pending.append(executor.submit(matching_utils.compute_features_from_store, self.compare_cl, candidate_links, 
+                                                   self._record_store["left"], left_positions, 
+                                                   self._record_store["right"], right_positions, self._cascade))
+                else:
+                    left_chunk, right_chunk = self._partition_records(left_positions, right_positions)
+                    pending.append(executor.submit(matching_utils.compute_features, self.compare_cl, 
+                                                   candidate_links, left_chunk, right_chunk, self._cascade))
+                if len(pending)>=2*n_jobs:
+                    yield self._compact_features(pending.popleft().result())
+            while pending:
+                yield self._compact_features(pending.popleft().result())
+
+    def _compact_features(self, features):
+        '''
+            Compact representation of the comparison matrix, when required by 'perform_linkage'
+            (see 'matching_utils.compact_features').
+        '''
+        if self._compact is None:
+            return features
+        right_index = self.right_df.index if self.right_df is not None else None
+        return matching_utils.compact_features(features, self.left_df.index, right_index, self._string_vars, self._compact)
+
+    def _apply_threshold(self, features, threshold):
+        '''
+            Reduce to zero all field scores less than 'threshold', considering the compact
+            representation of the scores, if the case.
+        '''
+        columns, scales = None, None
+        if self._compact is not None:
+            columns = [ col for col in features.columns if col not in ("left_pos", "right_pos") ]
+            if self._compact=="uint8":
+                scales = { col: 255 for col in self._string_vars }
+        return matching_utils.apply_threshold(features, threshold, columns, scales)
+
+    def expand_comparison_matrix(self, features=None):
+        '''
+            Translate a compact comparison matrix ('compact' argument of 'perform_linkage') back 
+            to float64 scores indexed by the pairs of IDs.
+
+            Args:
+            -----
+                features:
+                    pandas.DataFrame. Default None. Compact comparison matrix (e.g. a partition 
+                    from 'iter_comparison_matrix'). When None, 'comparison_matrix' is used.
+            Return:
+            -------
+                features:
+                    pandas.DataFrame.
+        '''
+        if features is None:
+            features = self._comparison_matrix
+        if self._compact is None:
+            return features
+
+        left_name = self.left_df.index.name
+        right_index, right_name = None, left_name
+        if self.right_df is not None:
+            right_index, right_name = self.right_df.index, self.right_df.index.name
+        names = [left_name, right_name]
+        if left_name is not None and left_name==right_name:
+            names = [f"{left_name}_1", f"{right_name}_2"]
+        return matching_utils.expand_features(features, self.left_df.index, right_index, self._string_vars, 
+                                              self._compact, names)
+
+    def _blocking_frames(self, rules):
+        '''
+            Blocking variables of each database, the only fields needed to generate the candidate pairs.
+        '''
+        blocking_cols = list(dict.fromkeys([ blocking_var for blocking_var, _ in rules ]))
+        left_block, right_block = self.left_df[blocking_cols], None
+        if self._left_unresolved is not None:
+            left_block = left_block.iloc[self._left_unresolved]
+        if self.right_df is not None:
+            right_block = self.right_df[blocking_cols]
+            if self._right_unresolved is not None:
+                right_block = right_block.iloc[self._right_unresolved]
+        return left_block, right_block
+
+    def _unresolved_positions(self, left_positions, right_positions=None):
+        '''
+            Map positions over the blocking frames (records not resolved by 'exact_prepass')
+            back to positions over the full databases.
+        '''
+        if self._left_unresolved is not None:
+            left_positions = self._left_unresolved[left_positions]
+        if right_positions is not None and self._right_unresolved is not None:
+            right_positions = self._right_unresolved[right_positions]
+        return left_positions, right_positions
+
+    def _partition_records(self, left_positions, right_positions=None):
+        '''
+            Records of each database needed by a partition of candidate pairs.
+        '''
+        left_chunk, right_chunk = self.left_df.iloc[left_positions], None
+        if right_positions is not None:
+            right_chunk = self.right_df.iloc[right_positions]
+        return left_chunk, right_chunk
+
+    def _shard_size(self, n_jobs):
+        '''
+            Number of records for each shard of the blocking keys when comparing in parallel
+            (roughly four shards per worker, to balance uneven blocks).
+        '''
+        nrecords = self.left_df.shape[0] if self.right_df is None else self.right_df.shape[0]
+        return max(1, int(np.ceil(nrecords/(4*n_jobs))))
+
+    def _stream_linkage(self, partitions, output_fname, n_jobs=None):
+        '''
+            Compare the candidate pairs partition by partition, appending the scores of each
+            partition to the file '{output_fname}.parquet' inside the working folder. Only
+            a single partition is kept in memory at a time.
+
+            Args:
+            -----
+                partitions:
+                    Iterable of 3-tuples. (candidate_links, left_positions, right_positions) as
+                    generated by 'matching_utils.partitioned_candidates'.
+                output_fname:
+                    String. Name of the parquet file (without extension).
+                n_jobs:
+                    Integer. Default None. Number of worker processes.
+            Return:
+            -------
+                npairs:
+                    Integer. Total number of pairs compared.
+        '''
+        if self.env_folder is None:
+            raise OutputPathMissing("Partitioned linkage requires a working folder ('env_folder').")
+
+        # --> Scores of a previous run must not survive a run with no pairs.
+        output_path = os.path.join(self.env_folder, f"{output_fname}.parquet")
+        if os.path.isfile(output_path):
+            os.remove(output_path)
+
+        writer, npairs = None, 0
+        try:
+            for features in self._compute_partitions(partitions, n_jobs):
+                # --> Empty partitions (e.g. all pairs dropped by the cascade) have untyped (null) columns.
+                if features.shape[0]==0:
+                    continue
+                table = pa.Table.from_pandas(features, preserve_index=False if self._compact is not None else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                npairs += features.shape[0]
+        finally:
+            if writer is not None:
+                writer.close()
+        return npairs
+
+    def iter_comparison_matrix(self, output_fname="feature_pairs", threshold=None):
+        '''
+            Read back, one partition at a time, the scores saved in the working folder
+            by a partitioned linkage ('chunksize' argument of 'perform_linkage'). Nothing is
+            yielded when the linkage found no pairs.
+
+            Args:
+            -----
+                output_fname:
+                    String. Name of the parquet file (without extension).
+                threshold:
+                    Float. Default None. All field scores less than 'threshold' are reduced to zero.
+                    When None, the 'threshold' given to 'perform_linkage' is used.
+            Return:
+            -------
+                generator of pandas.DataFrame.
+        '''
+        if self.env_folder is None:
+            raise OutputPathMissing("No working folder was provided.")
+        if threshold is None:
+            threshold = self._threshold
+
+        output_path = os.path.join(self.env_folder, f"{output_fname}.parquet")
+        if not os.path.isfile(output_path):
+            # --> Partitioned linkage with no pairs: no file is written.
+            return
+        parquet_file = pq.ParquetFile(output_path)
+        for group in range(parquet_file.num_row_groups):
+            features = parquet_file.read_row_group(group).to_pandas()
+            yield self._apply_threshold(features, threshold)
+
     '''
         ------------------------------------------
         ------------ INPUT AND OUTPUT ------------
         ------------------------------------------
     '''
+    def original_ids(self, pairs):
+        '''
+            Translate pairs of integer surrogate keys back to the original IDs of the records.
+
+            Args:
+            -----
+                pairs:
+                    pandas.DataFrame. A dataframe containing the columns "left_id" and "right_id".
+            Return:
+            -------
+                pairs:
+                    pandas.DataFrame. Copy of 'pairs' with the original IDs.
+        '''
+        pairs = pairs.copy()
+        if self.left_id_map is not None:
+            pairs["left_id"] = matching_utils.translate_ids(pairs["left_id"], self.left_id_map)
+        if self.right_id_map is not None:
+            pairs["right_id"] = matching_utils.translate_ids(pairs["right_id"], self.right_id_map)
+        return pairs
+
     def save_pairs(self, positive_pairs, potential_pairs, negative_pairs,  
                    left_cols=None, right_cols=None, duplicate_text_default=None, 
-                   overwrite=False, negative_max=5000):
+                   overwrite=False, negative_max=5000, fmt="json", shard_size=None, random_state=None):
         '''
             Save pairs (negative, positive and potential pairs) considering a 
             format for further annotation.
@@ -123,8 +503,9 @@ class MatchingBase:
                     List. List of 2-tuples containing the pair of IDs representing
                     the pairs classified as potential pairs (to be classified manually).
                 negative_pairs:
-                    List. List of 2-tuples containing the pair of IDs representing
-                    the pairs classified as negative.
+                    List, numpy.array, pandas.MultiIndex or iterator of 2-tuples containing 
+                    the pair of IDs representing the pairs classified as negative. Iterators
+                    are consumed in a single pass, without building the full list.
                 left_cols:
                     List. Default None. Columns to be used when saving the information of
                     a given record from the left database.
@@ -138,7 +519,17 @@ class MatchingBase:
                     Boolean. If False it will not override the existing files of 
                     classified pairs. 
                 negative_max:
-                    Integer. Default None. Maximum number of negative pairs to be stored.
+                    Integer. Default 5000. Maximum number of negative pairs to be stored. The
+                    stored pairs are a uniform sample (reservoir sampling) of 'negative_pairs'.
+                fmt:
+                    String. {'json', 'jsonl'}. Default 'json'. 'jsonl' writes one pair per line
+                    (JSON Lines) as the pairs are produced, instead of a single JSON object.
+                shard_size:
+                    Integer. Default None. With fmt='jsonl', number of pairs per file. Shards are
+                    written as 'part-00000.jsonl', 'part-00001.jsonl', ... inside a folder named 
+                    after the file (e.g. 'POSITIVE_PAIRS/').
+                random_state:
+                    Integer. Default None. Seed of the sample of negative pairs.
             Return:
             -------
                 None.
@@ -151,53 +542,261 @@ class MatchingBase:
             os.mkdir(annotation_folder)
         if not overwrite:
             raise Exception("Overwrite of annotation files not allowed.")
+        if fmt not in ["json", "jsonl"]:
+            raise Exception(f"Annotation format '{fmt}' not recognized.")
+        # --> Stores and reviewer decisions refer to the previous annotation set.
+        self._clear_annotation_store(annotation_folder)
         
-        
-        json_list = matching_utils.create_json_pairs(self.left_df, self.right_df, left_cols, right_cols, 
-                                                     positive_pairs, "positive", duplicate_text_default)
-        pairs_json = {"pairs": json_list}
-        with open(os.path.join(self.env_folder, "annotation_files", "POSITIVE_PAIRS.json"), "w") as f:
-            json.dump(pairs_json, f, indent=4)
-        
-        json_list = matching_utils.create_json_pairs(self.left_df, self.right_df, left_cols, right_cols, 
-                                                               potential_pairs, "potential")
-        pairs_json = {"pairs": json_list}
-        with open(os.path.join(self.env_folder, "annotation_files", "POTENTIAL_PAIRS.json"), "w") as f:
-            json.dump(pairs_json, f, indent=4)
-    
-        json_list = matching_utils.create_json_pairs(self.left_df, self.right_df, left_cols, right_cols, 
-                                                              negative_pairs, "negative", rec_max=negative_max, 
-                                                              duplicate_text_default="no")
-        pairs_json = {"pairs": json_list}
-        with open(os.path.join(self.env_folder, "annotation_files", "NEGATIVE_PAIRS.json"), "w") as f:
-            json.dump(pairs_json, f, indent=4)
-        
+        # --> Annotation files hold the original IDs, even when matching over surrogate keys.
+        # --> Each side is translated on its own (only one side may use surrogate keys).
+        left_ids, right_ids = None, None
+        if self.left_id_map is not None:
+            left_ids = matching_utils.translate_ids(np.arange(self.left_id_map.shape[0]), self.left_id_map)
+        if self.right_id_map is not None:
+            right_ids = matching_utils.translate_ids(np.arange(self.right_id_map.shape[0]), self.right_id_map)
+
+        if negative_max is not None:
+            negative_pairs = matching_utils.reservoir_sample(negative_pairs, negative_max, random_state)
+
+        annotation_sets = [
+            ("POSITIVE_PAIRS", positive_pairs, {"classification": "positive", "duplicate_text_default": duplicate_text_default}),
+            ("POTENTIAL_PAIRS", potential_pairs, {"classification": "potential"}),
+            ("NEGATIVE_PAIRS", negative_pairs, {"classification": "negative", "duplicate_text_default": "no"}),
+        ]
+        for fname, pairs, kwargs in annotation_sets:
+            self._clear_annotation(annotation_folder, fname)
+            if fmt=="json":
+                json_list = matching_utils.create_json_pairs(self.left_df, self.right_df, left_cols, right_cols, pairs, 
+                                                             left_ids=left_ids, right_ids=right_ids, **kwargs)
+                pairs_json = {"pairs": json_list}
+                with open(os.path.join(annotation_folder, f"{fname}.json"), "w") as f:
+                    json.dump(pairs_json, f, indent=4)
+            else:
+                json_iter = matching_utils.iter_json_pairs(self.left_df, self.right_df, left_cols, right_cols, pairs, 
+                                                           left_ids=left_ids, right_ids=right_ids, **kwargs)
+                self._write_json_lines(json_iter, annotation_folder, fname, shard_size)
+
+    def _clear_annotation(self, annotation_folder, fname):
+        '''
+            Remove the existing annotation files of 'fname' (in any format).
+        '''
+        for path in [ os.path.join(annotation_folder, f"{fname}.json"), os.path.join(annotation_folder, f"{fname}.jsonl") ]:
+            if os.path.isfile(path):
+                os.remove(path)
+        shard_folder = os.path.join(annotation_folder, fname)
+        if os.path.isdir(shard_folder):
+            for shard in os.listdir(shard_folder):
+                if shard.endswith(".jsonl"):
+                    os.remove(os.path.join(shard_folder, shard))
+
+    def _clear_annotation_store(self, annotation_folder):
+        '''
+            Remove the columnar store of the annotated pairs and all the reviewer decisions
+            (compacted and delta files).
+        '''
+        for path in [ os.path.join(annotation_folder, "ANNOTATIONS.parquet"), os.path.join(annotation_folder, "DECISIONS.parquet") ]:
+            if os.path.isfile(path):
+                os.remove(path)
+        decisions_folder = os.path.join(annotation_folder, "decisions")
+        if os.path.isdir(decisions_folder):
+            for delta in os.listdir(decisions_folder):
+                if delta.endswith(".parquet"):
+                    os.remove(os.path.join(decisions_folder, delta))
+
+    def _write_json_lines(self, json_iter, annotation_folder, fname, shard_size=None):
+        '''
+            Stream the annotation records into JSON Lines file(s).
+        '''
+        if shard_size is None:
+            with open(os.path.join(annotation_folder, f"{fname}.jsonl"), "w") as f:
+                for pair_element in json_iter:
+                    f.write(json.dumps(pair_element)+"\n")
+            return
+
+        shard_folder = os.path.join(annotation_folder, fname)
+        if not os.path.isdir(shard_folder):
+            os.mkdir(shard_folder)
+        f, n_shard = None, 0
+        for count, pair_element in enumerate(json_iter):
+            if count%shard_size==0:
+                if f is not None:
+                    f.close()
+                f = open(os.path.join(shard_folder, f"part-{n_shard:05d}.jsonl"), "w")
+                n_shard+=1
+            f.write(json.dumps(pair_element)+"\n")
+        if f is not None:
+            f.close()
+
+    def _annotation_paths(self, annotation_folder, fname):
+        '''
+            Files holding the annotation records of 'fname', whatever the format.
+        '''
+        shard_folder = os.path.join(annotation_folder, fname)
+        if os.path.isfile(os.path.join(annotation_folder, f"{fname}.json")):
+            return [ os.path.join(annotation_folder, f"{fname}.json") ]
+        elif os.path.isfile(os.path.join(annotation_folder, f"{fname}.jsonl")):
+            return [ os.path.join(annotation_folder, f"{fname}.jsonl") ]
+        elif os.path.isdir(shard_folder):
+            return [ os.path.join(shard_folder, shard) for shard in sorted(os.listdir(shard_folder)) if shard.endswith(".jsonl") ]
+        raise AnnotationError(f"Annotation file '{fname}' does not exist.")
+
+    def iter_annotation(self, fname, annotation_folder="annotation_files"):
+        '''
+            Stream the annotation records of a given file, whatever the format it was saved in 
+            (JSON, JSON Lines or sharded JSON Lines).
+
+            Args:
+            -----
+                fname:
+                    String. Name of the annotation file without extension (e.g. 'POSITIVE_PAIRS').
+                annotation_folder:
+                    String. Default 'annotation_files'. Folder inside the working folder.
+            Return:
+            -------
+                pair_element:
+                    Dictionary. Annotation record of each pair.
+        '''
+        for path in self._annotation_paths(os.path.join(self.env_folder, annotation_folder), fname):
+            with open(path, "r", encoding="latin") as f:
+                if path.endswith(".json"):
+                    yield from json.load(f)["pairs"]
+                    continue
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
 
     def load_pairs(self, annotation_folder="annotation_files"):
         '''
-        
+            Load the annotated positive and potential pairs. 
+
+            The pairs are kept in a columnar store ('ANNOTATIONS.parquet') next to the annotation
+            files, built from them on the first load (or when they are newer than the store). 
+            Reviewer decisions ('DECISIONS.parquet' and the delta files saved through 
+            'save_decisions') are kept apart from the store and always merged on load.
+
+            Args:
+            -----
+                annotation_folder:
+                    String. Default 'annotation_files'. Folder inside the working folder.
+            Return:
+            -------
+                df_pairs:
+                    pandas.DataFrame. Columns: 'left_id', 'right_id', 'classification', 
+                    'duplicate' and 'keep'.
         '''
-        annotation_folder = os.path.join(self.env_folder, annotation_folder)
-        if not os.path.isdir(annotation_folder):
+        folder = os.path.join(self.env_folder, annotation_folder)
+        if not os.path.isdir(folder):
             raise AnnotationError("Annotation folder does not exist.")
 
-        with open(os.path.join(annotation_folder, "POSITIVE_PAIRS.json"), "r", encoding="latin") as f:
-            positive_p = json.load(f)
-        with open(os.path.join(annotation_folder, "POTENTIAL_PAIRS.json"), "r", encoding="latin") as f:
-            potential_p = json.load(f)
-        
-        pairs = positive_p["pairs"] + potential_p["pairs"]
-
-        # --> Create dataframe
-        df_pairs = {
-            "left_id": [ pair["identifiers"]["a"] for pair in pairs ],
-            "right_id": [ pair["identifiers"]["b"] for pair in pairs ],
-            "classification": [ pair["classification"] for pair in pairs ],
-            "duplicate": [ pair["duplicate"] for pair in pairs ],
-            "keep": [ pair["keep"] for pair in pairs ],
-        }
-        df_pairs = pd.DataFrame(df_pairs)
-        return df_pairs
+        store_path = os.path.join(folder, "ANNOTATIONS.parquet")
+        sources = self._annotation_paths(folder, "POSITIVE_PAIRS") + self._annotation_paths(folder, "POTENTIAL_PAIRS")
+        if not os.path.isfile(store_path) or max([ os.path.getmtime(path) for path in sources ], default=0)>os.path.getmtime(store_path):
+            # --> Create dataframe
+            fields = ["left_id", "right_id", "classification", "duplicate", "keep"]
+            df_pairs = { field: [] for field in fields }
+            for fname in ["POSITIVE_PAIRS", "POTENTIAL_PAIRS"]:
+                for pair in self.iter_annotation(fname, annotation_folder):
+                    df_pairs["left_id"].append(pair["identifiers"]["a"])
+                    df_pairs["right_id"].append(pair["identifiers"]["b"])
+                    df_pairs["classification"].append(pair["classification"])
+                    df_pairs["duplicate"].append(pair["duplicate"])
+                    df_pairs["keep"].append(pair["keep"])
+            df_pairs = pd.DataFrame(df_pairs)
+            df_pairs.to_parquet(store_path, index=False)
+        else:
+            df_pairs = pd.read_parquet(store_path)
+
+        # --> Merge the reviewer decisions (latest decision of each pair prevails).
+        decisions = self._read_decisions(folder)
+        if decisions is None:
+            return df_pairs
+
+        df_pairs = df_pairs.set_index(["left_id", "right_id"])
+        unknown = decisions.index.difference(df_pairs.index)
+        if len(unknown):
+            print(f"{len(unknown)} reviewer decision(s) on pairs not annotated were ignored.")
+        df_pairs.update(decisions)
+        return df_pairs.reset_index()
+
+    def _read_decisions(self, folder):
+        '''
+            Latest reviewer decision of each pair, from the compacted decisions and the delta 
+            files (in order of creation). Missing values keep the previous decision.
+
+            Args:
+            -----
+                folder:
+                    String. Path of the annotation folder.
+            Return:
+            -------
+                decisions:
+                    pandas.DataFrame indexed by ('left_id', 'right_id'), or None when there are
+                    no decisions.
+        '''
+        decisions = []
+        if os.path.isfile(os.path.join(folder, "DECISIONS.parquet")):
+            decisions.append(pd.read_parquet(os.path.join(folder, "DECISIONS.parquet")))
+        decisions_folder = os.path.join(folder, "decisions")
+        if os.path.isdir(decisions_folder):
+            decisions += [ pd.read_parquet(os.path.join(decisions_folder, delta)) for delta in sorted(os.listdir(decisions_folder)) if delta.endswith(".parquet") ]
+        if len(decisions)==0:
+            return None
+        return pd.concat(decisions, ignore_index=True).groupby(["left_id", "right_id"], sort=False).last()
+
+    def save_decisions(self, decisions, annotation_folder="annotation_files"):
+        '''
+            Append reviewer decisions as a small delta file, merged into the annotated pairs 
+            by 'load_pairs'.
+
+            Args:
+            -----
+                decisions:
+                    pandas.DataFrame. Columns 'left_id' and 'right_id' identifying the pairs, plus
+                    any of 'classification', 'duplicate' and 'keep' (missing values keep the 
+                    previous decision).
+                annotation_folder:
+                    String. Default 'annotation_files'. Folder inside the working folder.
+            Return:
+            -------
+                None.
+        '''
+        if self.env_folder is None:
+            raise Exception("No working folder was provided.")
+        if "left_id" not in decisions.columns or "right_id" not in decisions.columns:
+            raise AnnotationError("Decisions must identify the pairs through 'left_id' and 'right_id'.")
+
+        decisions_folder = os.path.join(self.env_folder, annotation_folder, "decisions")
+        if not os.path.isdir(decisions_folder):
+            os.makedirs(decisions_folder)
+        columns = [ col for col in ["left_id", "right_id", "classification", "duplicate", "keep"] if col in decisions.columns ]
+        decisions[columns].to_parquet(os.path.join(decisions_folder, f"delta-{time.time_ns()}.parquet"), index=False)
+
+    def compact_decisions(self, annotation_folder="annotation_files"):
+        '''
+            Fold the delta files of reviewer decisions into a single file of decisions 
+            ('DECISIONS.parquet'). The decisions are kept apart from the store of annotated 
+            pairs, so they survive a rebuild of the store from the annotation files.
+
+            Args:
+            -----
+                annotation_folder:
+                    String. Default 'annotation_files'. Folder inside the working folder.
+            Return:
+            -------
+                df_pairs:
+                    pandas.DataFrame. Annotated pairs after merging the decisions.
+        '''
+        folder = os.path.join(self.env_folder, annotation_folder)
+        decisions = self._read_decisions(folder)
+        if decisions is not None:
+            decisions.reset_index().to_parquet(os.path.join(folder, "DECISIONS.parquet"), index=False)
+
+        decisions_folder = os.path.join(folder, "decisions")
+        if os.path.isdir(decisions_folder):
+            for delta in os.listdir(decisions_folder):
+                if delta.endswith(".parquet"):
+                    os.remove(os.path.join(decisions_folder, delta))
+        return self.load_pairs(annotation_folder)
 
     '''
         ---------------------------------------------------
@@ -231,6 +830,29 @@ class MatchingBase:
                                               left_cols=left_cols, right_cols=right_cols, random_state=random_state)
         return display_df
 
+    def pair_browser(self, pairs, left_cols=None, right_cols=None, random_state=None):
+        '''
+            Create a browser over the pairs 'pairs' obtained by the matching, giving constant
+            time random or sequential access to the records of each pair (see 'matching_utils.PairBrowser').
+
+            Args:
+            -----
+                pairs:
+                    List or pandas.MultiIndex.
+                left_cols:
+                    List. Default None.
+                right_cols:
+                    List. Default None.
+                random_state:
+                    Integer. Default None.
+            Return:
+            -------
+                browser:
+                    matching_utils.PairBrowser.
+        '''
+        return matching_utils.PairBrowser(pairs, self.left_df, self.right_df, left_cols=left_cols, 
+                                          right_cols=right_cols, random_state=random_state)
+
     def score_summary(self, score_arr, bins, range_certain, range_potential, scale="linear"):
         '''
             Plot a distribution of the scores resulted from the data matching process.
@@ -10,10 +10,7 @@
 
 import os
 import json
-import numpy as np
 import pandas as pd
-import recordlinkage
-from recordlinkage.index import SortedNeighbourhood
 
 from linkage_saude.exceptions import *
 from linkage_saude.matching.MatchingBase import MatchingBase
@@ -22,75 +19,150 @@ import linkage_saude.utils.matching as matching_utils
 
 class Deduple(MatchingBase):
 
-    # TO DO: DEDUPLE OVER CHUNKSIZES (FOR VERY LARGE DATASETS) -> Could be done from outside
-    def perform_linkage(self, blocking_var, window=1, output_fname="feature_pairs", threshold=None):
+    def perform_linkage(self, blocking_var, window=1, output_fname="feature_pairs", threshold=None, chunksize=None, n_jobs=None, 
+                        compact=None):
         '''
             After setting the properties of the linkage, blocking is defined and the linkage is performed.
 
             Args:
             -----
                 blocking_var:
-                    String. Name of the field regarding the blocking variable for the linkage.
+                    String or List. Name of the field regarding the blocking variable for the linkage. 
+                    A list of blocking rules performs one blocking pass per rule, each element being 
+                    either a field name (using 'window') or a 2-tuple (field name, window). Candidate 
+                    pairs of all passes are merged without duplicates before the comparison.
                 window:
                     Odd Integer. Window parameter for the sorted neighborhood blocking algorithm. 
                     window equal one means exact blocking.
-                chunksize: NOT IMPLEMENTED.
-                    Integer. Size of each partition of the right (BOTH!) database for partitioned linkage 
-                    (used for large databases).
+                output_fname:
+                    String. Name of the parquet file (inside 'env_folder') to store the scores of all pairs.
+                threshold:
+                    Float. Default None. All field scores less than 'threshold' are reduced to zero.
+                chunksize:
+                    Integer. Default None. Maximum number of records of each partition of the sorted blocking
+                    keys for partitioned deduplication (used for large databases). Partitions are compared
+                    one at a time and their scores are appended to '{output_fname}.parquet', so 'env_folder'
+                    is required and 'comparison_matrix' is not kept in memory. Use 'iter_comparison_matrix' 
+                    to read the scores back ('threshold' is applied partition by partition).
+                n_jobs:
+                    Integer. Default None. Number of worker processes. When larger than one, candidate pairs
+                    are sharded by blocking key and compared in a pool of processes, the shards being merged 
+                    back into a single comparison matrix (or streamed, when 'chunksize' is set).
+                compact:
+                    String. Default None. {'float16', 'uint8'}. Compact representation of the comparison 
+                    matrix (in memory and on disk): pairs as int32 positions into the databases ("left_pos", 
+                    "right_pos"), 'exact' scores as uint8 and 'string' scores as float16 or quantised uint8. 
+                    Use 'expand_comparison_matrix' to recover the scores indexed by the IDs.
         '''
+        rules = matching_utils.blocking_rules(blocking_var, window)
+        left_block, _ = self._blocking_frames(rules)
+
+        self._threshold, self._compact = threshold, compact
+
+        # --> Partitioned deduplication: scores are streamed to disk.
+        if chunksize is not None:
+            partitions = matching_utils.partitioned_candidates(rules, chunksize, left_block)
+            npairs = self._stream_linkage(partitions, output_fname, n_jobs)
+            print(f"Number of pairs: {npairs}")
+            return self
 
         # --> set blocking rule and create pairs for comparison
-        indexer = recordlinkage.Index()
-        indexer.add(SortedNeighbourhood(blocking_var, blocking_var, window=window))
-        candidate_links = indexer.index(self.left_df)
-        print(f"Number of pairs: {len(candidate_links)}")
-        if len(candidate_links):
-            self._comparison_matrix = self.compare_cl.compute(candidate_links, self.left_df)
+        if n_jobs is not None and n_jobs>1:
+            # ----> Candidate pairs sharded by blocking key and compared in a pool of processes.
+            shards = matching_utils.partitioned_candidates(rules, self._shard_size(n_jobs), left_block)
+            features = list(self._compute_partitions(shards, n_jobs))
+            print(f"Number of pairs: {sum([ f.shape[0] for f in features ])}")
+            if len(features):
+                self._comparison_matrix = pd.concat(features, ignore_index=compact is not None)
+            else:
+                return self
         else:
-            return self
+            candidate_links = matching_utils.blocking_candidates(rules, left_block)
+            print(f"Number of pairs: {len(candidate_links)}")
+            if len(candidate_links):
+                self._comparison_matrix = self._compact_features(self._compute_features(candidate_links, self.left_df))
+            else:
+                return self
 
         # --> Save scores for all pairs
         if self.env_folder is not None:
             self._comparison_matrix.to_parquet(os.path.join(self.env_folder, f"{output_fname}.parquet"))
 
-        # --> All field scores less than 'threshold' are reduced to zero.
-        if threshold is not None and threshold<=1.0:
-            self._comparison_matrix[self._comparison_matrix<threshold] = 0.0
+        # --> All field scores less than 'threshold' are reduced to zero (column by column).
+        self._apply_threshold(self._comparison_matrix, threshold)
 
 
 class PLinkage(MatchingBase):
 
-    # TO DO: LINKAGE OVER CHUNKSIZES (FOR VERY LARGE DATASETS)
-    def perform_linkage(self, blocking_var, window=1, output_fname="feature_pairs", threshold=None):
+    def perform_linkage(self, blocking_var, window=1, output_fname="feature_pairs", threshold=None, chunksize=None, n_jobs=None, 
+                        compact=None):
         '''
             After setting the properties of the linkage, blocking is defined and the linkage is performed.
 
             Args:
             -----
                 blocking_var:
-                    String. Name of the field regarding the blocking variable for the linkage.
+                    String or List. Name of the field regarding the blocking variable for the linkage. 
+                    A list of blocking rules performs one blocking pass per rule, each element being 
+                    either a field name (using 'window') or a 2-tuple (field name, window). Candidate 
+                    pairs of all passes are merged without duplicates before the comparison.
                 window:
                     Odd Integer. Window parameter for the sorted neighborhood blocking algorithm. 
                     window equal one means exact blocking.
-                chunksize: NOT IMPLEMENTED.
-                    Integer. Size of each partition of the right (BOTH!) database for partitioned linkage 
-                    (used for large databases).
+                output_fname:
+                    String. Name of the parquet file (inside 'env_folder') to store the scores of all pairs.
+                threshold:
+                    Float. Default None. All field scores less than 'threshold' are reduced to zero.
+                chunksize:
+                    Integer. Default None. Maximum number of records of the right database in each partition
+                    of the sorted blocking keys for partitioned linkage (used for large databases). Each 
+                    partition is compared only against the slice of the left database whose keys fall inside
+                    the window, and the scores are appended to '{output_fname}.parquet', so 'env_folder' is 
+                    required and 'comparison_matrix' is not kept in memory. Use 'iter_comparison_matrix' 
+                    to read the scores back ('threshold' is applied partition by partition).
+                n_jobs:
+                    Integer. Default None. Number of worker processes. When larger than one, candidate pairs
+                    are sharded by blocking key and compared in a pool of processes, the shards being merged 
+                    back into a single comparison matrix (or streamed, when 'chunksize' is set).
+                compact:
+                    String. Default None. {'float16', 'uint8'}. Compact representation of the comparison 
+                    matrix (in memory and on disk): pairs as int32 positions into the databases ("left_pos", 
+                    "right_pos"), 'exact' scores as uint8 and 'string' scores as float16 or quantised uint8. 
+                    Use 'expand_comparison_matrix' to recover the scores indexed by the IDs.
         '''
+        rules = matching_utils.blocking_rules(blocking_var, window)
+        left_block, right_block = self._blocking_frames(rules)
+
+        self._threshold, self._compact = threshold, compact
+
+        # --> Partitioned linkage: scores are streamed to disk.
+        if chunksize is not None:
+            partitions = matching_utils.partitioned_candidates(rules, chunksize, left_block, right_block)
+            npairs = self._stream_linkage(partitions, output_fname, n_jobs)
+            print(f"Number of pairs: {npairs}")
+            return self
         
         # --> set blocking rule and create pairs for comparison
-        indexer = recordlinkage.Index()
-        indexer.add(SortedNeighbourhood(blocking_var, blocking_var, window=window))
-        candidate_links = indexer.index(self.left_df, self.right_df)
-        print(f"Number of pairs: {len(candidate_links)}")
-        if len(candidate_links):
-            self._comparison_matrix = self.compare_cl.compute(candidate_links, self.left_df, self.right_df)
+        if n_jobs is not None and n_jobs>1:
+            # ----> Candidate pairs sharded by blocking key and compared in a pool of processes.
+            shards = matching_utils.partitioned_candidates(rules, self._shard_size(n_jobs), left_block, right_block)
+            features = list(self._compute_partitions(shards, n_jobs))
+            print(f"Number of pairs: {sum([ f.shape[0] for f in features ])}")
+            if len(features):
+                self._comparison_matrix = pd.concat(features, ignore_index=compact is not None)
+            else:
+                return self
         else:
-            return self
+            candidate_links = matching_utils.blocking_candidates(rules, left_block, right_block)
+            print(f"Number of pairs: {len(candidate_links)}")
+            if len(candidate_links):
+                self._comparison_matrix = self._compact_features(self._compute_features(candidate_links, self.left_df, self.right_df))
+            else:
+                return self
 
         # --> Save scores for all pairs
         if self.env_folder is not None:
             self._comparison_matrix.to_parquet(os.path.join(self.env_folder, f"{output_fname}.parquet"))
 
-        # --> All field scores less than 'threshold' are reduced to zero.
-        if threshold is not None and threshold<=1.0:
-            self._comparison_matrix[self._comparison_matrix<threshold] = 0.0
\ No newline at end of file
+        # --> All field scores less than 'threshold' are reduced to zero (column by column).
+        self._apply_threshold(self._comparison_matrix, threshold)
\ No newline at end of file
@@ -1 +1,2 @@
-from .MatchingData import *
\ No newline at end of file
+from .MatchingData import *
+from .ClusterStore import *
\ No newline at end of file
@@ -4,9 +4,38 @@
     Create the general class able to handle universal processing tasks. 
 '''
 
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 from linkage_saude.exceptions import *
 
+class _DataChunk:
+    '''
+        Row chunk of a validated data object, handed to the processing class inside
+        the worker processes of 'ProcessBase.run_parallel'.
+    '''
+    has_id = True
+    validated = True
+
+    def __init__(self, raw_data, data) -> None:
+        self._raw_data = raw_data
+        self._data = data
+
+def _transform_chunk(process_class, method, raw_chunk, data_chunk, kwargs):
+    '''
+        Run the transform 'method' of 'process_class' over a single chunk of rows and
+        return the transformed chunk.
+    '''
+    processing = process_class(_DataChunk(raw_chunk, data_chunk))
+    getattr(processing, method)(**kwargs)
+    return processing._data
+
 class ProcessBase:
+    # --> Derived columns of the transforms: {column: (dependencies, function(raw_data, data))}.
+    derived_columns = {}
+
     def __init__(self, DataObject) -> None:
         '''
         
@@ -40,4 +69,198 @@ class ProcessBase:
         '''
             Method to handle transformation steps specific to the database.
         '''
-        pass
\ No newline at end of file
+        pass
+
+    def column_graph(self, **kwargs):
+        '''
+            Graph of the derived columns for the options of the transform. Each column maps
+            to its dependencies (other derived columns) and to the function computing it 
+            from the raw data and the data already derived.
+
+            Return:
+            -------
+                Dictionary. {column: (dependencies, function)}.
+        '''
+        return self.derived_columns
+
+    def resolve_columns(self, columns=None, **kwargs):
+        '''
+            Order in which the derived columns must be computed to obtain 'columns': the
+            requested columns and all of their dependencies, each dependency before the
+            columns using it.
+
+            Args:
+            -----
+                columns:
+                    List of strings. Default None. Requested columns (all derived columns
+                    when None). The keys of the 'compare_rules' of a linkage can be passed.
+                **kwargs:
+                    Options of the transform (see 'column_graph').
+            Return:
+            -------
+                List of strings.
+        '''
+        graph = self.column_graph(**kwargs)
+        columns = list(graph) if columns is None else list(columns)
+        unknown = [ column for column in columns if column not in graph ]
+        if len(unknown):
+            raise KeyError(f"Columns not derived by '{type(self).__name__}': {unknown}.")
+
+        order, visiting, visited = [], set(), set()
+        for column in columns:
+            # --> Iterative depth-first search, emitting each column after its dependencies.
+            stack = [(column, iter(graph[column][0]))]
+            visiting.add(column)
+            while stack:
+                current, dependencies = stack[-1]
+                dependency = next(dependencies, None)
+                if dependency is None:
+                    stack.pop()
+                    visiting.discard(current)
+                    if current not in visited:
+                        visited.add(current)
+                        order.append(current)
+                elif dependency in visiting:
+                    raise Exception(f"Cyclic dependency between derived columns: '{current}' and '{dependency}'.")
+                elif dependency not in visited:
+                    visiting.add(dependency)
+                    stack.append((dependency, iter(graph[dependency][0])))
+        return order
+
+    def compute_columns(self, columns=None, **kwargs):
+        '''
+            Compute only the requested derived columns (and their dependencies). Columns
+            not needed are never computed.
+
+            Args:
+            -----
+                columns:
+                    List of strings. Default None. Requested columns (all derived columns
+                    when None).
+                **kwargs:
+                    Options of the transform (see 'column_graph').
+            Return:
+            -------
+                data:
+                    pandas.DataFrame.
+        '''
+        graph = self.column_graph(**kwargs)
+        for column in self.resolve_columns(columns, **kwargs):
+            self._data[column] = graph[column][1](self._raw_data, self._data)
+        return self._data
+
+    def run_parallel(self, method="process", n_jobs=None, chunksize=None, **kwargs):
+        '''
+            Run a transform specific to the database ('process', 'matching_standard', ...) 
+            in parallel. The raw data is split into chunks of consecutive rows, each chunk
+            is transformed by a pool of 'n_jobs' processes and the transformed chunks are
+            concatenated back in the original order. At most 2*n_jobs chunks are in flight.
+
+            The transforms are row-wise, so the result has the same values as the serial
+            call. Columns whose dtype is inferred from their values may be upcast when 
+            chunks disagree (e.g. an all-missing chunk).
+
+            Args:
+            -----
+                method:
+                    String. Default "process". Name of the transform method.
+                n_jobs:
+                    Integer. Default None. Number of worker processes. When None or one, the
+                    transform runs serially (as in 'perform_linkage').
+                chunksize:
+                    Integer. Default None. Number of rows of each chunk (roughly four chunks
+                    per worker when None).
+                **kwargs:
+                    Arguments of the transform method.
+            Return:
+            -------
+                data:
+                    pandas.DataFrame. Transformed data.
+        '''
+        if not hasattr(self, method):
+            raise AttributeError(f"'{type(self).__name__}' has no transform '{method}'.")
+        if n_jobs is None or n_jobs<=1:
+            getattr(self, method)(**kwargs)
+            return self._data
+
+        nrows = self._raw_data.shape[0]
+        if chunksize is None:
+            chunksize = max(1, int(np.ceil(nrows/(4*n_jobs))))
+
+        chunks = []
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            pending = deque()
+            for start in range(0, nrows, chunksize):
+                pending.append(executor.submit(_transform_chunk, type(self), method, 
+                                               self._raw_data.iloc[start:start+chunksize], 
+                                               self._data.iloc[start:start+chunksize], kwargs))
+                if len(pending)>=2*n_jobs:
+                    chunks.append(pending.popleft().result())
+            while pending:
+                chunks.append(pending.popleft().result())
+
+        if chunks:
+            self._data = pd.concat(chunks)
+            self.data_object._data = self._data
+        return self._data
+
+    def _define_duplicate(self, persons_pairs, id_col, unit_col, delta_notific=None, delta_sintomas=None, same_unit=None):
+        '''
+            Split pairs of records of the same person into duplicates (positives) and distinct 
+            notifications (negatives), considering the time between the notifications, the time
+            between the first symptoms and, optionally, the notification unit. The fields of 
+            all pairs are gathered at once and compared as arrays.
+
+            Args:
+            -----
+                persons_pairs:
+                    List of 2-tuples, numpy.array (n x 2) or pandas.MultiIndex. Pairs of IDs.
+                id_col:
+                    String. Field of the unique identifier in the raw data.
+                unit_col:
+                    String. Field of the notification unit in the raw data.
+                delta_notific:
+                    Integer. Default None. Maximum number of days between notifications (None
+                    for no limit).
+                delta_sintomas:
+                    Integer. Default None. Maximum number of days between first symptoms (None
+                    for no limit).
+                same_unit:
+                    Boolean. Default None. Duplicates must be notified by the same unit.
+            Return:
+            -------
+                positives:
+                    numpy.array (n x 2) of the positive pairs (pandas.MultiIndex when 'persons_pairs'
+                    is a MultiIndex).
+                negatives:
+                    numpy.array (n x 2) of the negative pairs (pandas.MultiIndex when 'persons_pairs'
+                    is a MultiIndex).
+        '''
+        if isinstance(persons_pairs, pd.MultiIndex):
+            left, right = persons_pairs.get_level_values(0), persons_pairs.get_level_values(1)
+        else:
+            persons_pairs = np.asarray(persons_pairs).reshape(-1, 2)
+            left, right = persons_pairs[:, 0], persons_pairs[:, 1]
+
+        ids = pd.Index(self._raw_data[id_col])
+        left_pos, right_pos = ids.get_indexer(left), ids.get_indexer(right)
+        if (left_pos==-1).any() or (right_pos==-1).any():
+            raise KeyError("Pairs contain records not found in the database.")
+
+        # --> Days between the dates of each pair (as in 'abs(timedelta.days)'). Missing dates fail the criteria.
+        positive = np.ones(left_pos.shape[0], dtype=bool)
+        for date_col, max_delta in [("DT_NOTIFIC", delta_notific), ("DT_SIN_PRI", delta_sintomas)]:
+            dates = pd.to_datetime(self._raw_data[date_col]).to_numpy(dtype="datetime64[ns]")
+            delta = dates[left_pos]-dates[right_pos]
+            valid = ~np.isnat(delta)
+            days = np.zeros(delta.shape[0], dtype=np.int64)
+            days[valid] = np.abs(delta[valid].astype(np.int64)//86400000000000)
+            positive &= valid
+            if max_delta is not None:
+                positive &= days<=max_delta
+
+        if same_unit:
+            # --> Element-wise Python equality, as in 'id_not_left==id_not_right'.
+            units = self._raw_data[unit_col].to_numpy(dtype=object)
+            positive &= np.asarray(units[left_pos]==units[right_pos], dtype=bool)
+        return persons_pairs[positive], persons_pairs[~positive]
\ No newline at end of file
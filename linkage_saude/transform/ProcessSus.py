@@ -15,93 +15,129 @@ from linkage_saude.exceptions import *
 import linkage_saude.utils.general as general_utils
 from linkage_saude.transform.ProcessBase import ProcessBase
 
+# --> Tokens of the names (as in 'split(" ")'), extracted with Arrow regex kernels.
+FIRST_TOKEN = r"^(?P<token>[^ ]*)"
+LAST_TOKEN = r"(?s)(?:^|.* )(?P<token>[^ ]*)$"
+SECOND_TOKEN = r"^[^ ]* (?P<token>[^ ]*)"
+AFTER_FIRST_TOKEN = r"(?s)^[^ ]* (?P<token>.*)$"
+AFTER_SECOND_TOKEN = r"(?s)^[^ ]* [^ ]* (?P<token>.*)$"
+
+def _classif_nascido(raw, data):
+    '''
+        Name of the newborn without the name of the mother (records of congenital syphilis).
+    '''
+    classif_nascido = pd.Series([ nome.replace(nome_mae, '') if pd.notna(nome) and pd.notna(nome_mae) and nome_mae in nome else nome 
+                                  for nome, nome_mae in zip(data["nome"], data["nome_mae"]) ], index=data.index, dtype=object)
+    return classif_nascido.str.strip().str.replace(" DE", "", regex=False)
+
+# --> Derived columns shared by SINAN and SIVEP-Gripe: {column: (dependencies, function(raw, data))}.
+# --> With no columns requested, all columns are computed in the order of the dictionaries.
+PERSON_COLUMNS = {
+    "nome": ((), lambda raw, data: general_utils.uniformize_names(raw["NM_PACIENT"], squeeze_spaces=True)),
+    "nome_mae": ((), lambda raw, data: general_utils.uniformize_names(raw["NM_MAE_PAC"], squeeze_spaces=True)),
+    "sexo": ((), lambda raw, data: general_utils.upper_strip(raw["CS_SEXO"])),
+    "dt_nasc": ((), lambda raw, data: general_utils.parse_dates(raw["DT_NASC"], format="%d/%m/%Y")),
+}
+NAME_COLUMNS = {
+    "nascimento_dia": (("dt_nasc",), lambda raw, data: general_utils.date_part(data["dt_nasc"], "day")),
+    "nascimento_mes": (("dt_nasc",), lambda raw, data: general_utils.date_part(data["dt_nasc"], "month")),
+    "nascimento_ano": (("dt_nasc",), lambda raw, data: general_utils.date_part(data["dt_nasc"], "year")),
+    "primeiro_nome": (("nome",), lambda raw, data: general_utils.extract_pattern(data["nome"], FIRST_TOKEN)),
+    #"segundo_nome": (("nome",), lambda raw, data: general_utils.extract_pattern(data["nome"], SECOND_TOKEN)),
+    "complemento_nome": (("nome",), lambda raw, data: general_utils.extract_pattern(data["nome"], AFTER_FIRST_TOKEN)),
+    "primeiro_nome_mae": (("nome_mae",), lambda raw, data: general_utils.extract_pattern(data["nome_mae"], FIRST_TOKEN)),
+    "segundo_nome_mae": (("nome_mae",), lambda raw, data: general_utils.extract_pattern(data["nome_mae"], SECOND_TOKEN)),
+    "complemento_nome_mae": (("nome_mae",), lambda raw, data: general_utils.extract_pattern(data["nome_mae"], AFTER_SECOND_TOKEN)),
+}
+
+SINAN_FIELD_COLUMNS = {
+    **PERSON_COLUMNS,
+    "cns": ((), lambda raw, data: general_utils.standard_codes(raw["ID_CNS_SUS"], 13, validator=general_utils.cns_valid_mask)),
+    "cep": ((), lambda raw, data: general_utils.keep_valid(raw["NU_CEP"])),
+    "bairro": ((), lambda raw, data: general_utils.uniformize_names(raw["NM_BAIRRO"])),
+    "cod_unidade": ((), lambda raw, data: general_utils.keep_valid(raw["ID_UNIDADE"])),
+}
+SINAN_COLUMNS = {
+    **SINAN_FIELD_COLUMNS,
+    "FONETICA_N": (("nome",), lambda raw, data: general_utils.extract_pattern(data["nome"], FIRST_TOKEN) + general_utils.extract_pattern(data["nome"], LAST_TOKEN)),
+    **NAME_COLUMNS,
+}
+# --> Congenital syphilis: names of the newborns are derived from the names of the mothers.
+SINAN_SIFIC_COLUMNS = {
+    **SINAN_FIELD_COLUMNS,
+    "FONETICA_N": (("nome_mae",), lambda raw, data: general_utils.extract_pattern(data["nome_mae"], FIRST_TOKEN) + general_utils.extract_pattern(data["nome_mae"], LAST_TOKEN)),
+    "classif_nascido": (("nome", "nome_mae"), _classif_nascido),
+    **NAME_COLUMNS,
+    "primeiro_nome": (("classif_nascido",), lambda raw, data: general_utils.extract_pattern(data["classif_nascido"], FIRST_TOKEN)),
+    "complemento_nome": (("classif_nascido",), lambda raw, data: general_utils.extract_pattern(data["classif_nascido"], AFTER_SECOND_TOKEN)),
+}
+
+SIVEP_COLUMNS = {
+    **PERSON_COLUMNS,
+    "cpf": ((), lambda raw, data: general_utils.numeric_codes(raw["NU_CPF"], 11).astype(object).mask(~general_utils.is_numeric(raw["NU_CPF"]), raw["NU_CPF"]).infer_objects()),
+    "cns": ((), lambda raw, data: general_utils.standard_codes(raw["NU_CNS"], 13, validator=general_utils.cns_valid_mask)),
+    "cep": ((), lambda raw, data: general_utils.standard_codes(raw["NU_CEP"], 8)),
+    "bairro": ((), lambda raw, data: general_utils.uniformize_names(raw["NM_BAIRRO"])),
+    "cod_unidade": ((), lambda raw, data: general_utils.keep_valid(raw["CO_UNI_NOT"])),
+    "FONETICA_N": (("nome",), lambda raw, data: general_utils.extract_pattern(data["nome"], FIRST_TOKEN) + general_utils.extract_pattern(data["nome"], LAST_TOKEN)),
+    **NAME_COLUMNS,
+}
+
 class ProcessSinan_v2(ProcessBase):
     '''
     
     '''
     db_type = "SINAN"
+    derived_columns = SINAN_COLUMNS
 
-    def matching_standard(self, sific=False):
+    def column_graph(self, sific=False):
         '''
-        
+            Graph of the derived columns ('SINAN_SIFIC_COLUMNS' for congenital syphilis).
         '''
-        self._data["nome"] = self._raw_data["NM_PACIENT"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan).apply(lambda x: re.sub(' {2,}', ' ', x) if pd.notna(x) else np.nan)
-        self._data["nome_mae"] = self._raw_data["NM_MAE_PAC"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan).apply(lambda x: re.sub(' {2,}', ' ', x) if pd.notna(x) else np.nan)
-        self._data["sexo"] = self._raw_data["CS_SEXO"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan)
-        self._data["dt_nasc"] = self._raw_data["DT_NASC"].apply(lambda x: pd.to_datetime(x, format="%d/%m/%Y", errors="coerce") if not hasattr(x, 'year') and pd.notna(x) else x)
-        self._data["cns"] = self._raw_data["ID_CNS_SUS"].apply(lambda x: x if isinstance(x, str) and general_utils.cns_is_valid(x) and pd.notna(x) else ( f"{x:13.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else np.nan))
-        self._data["cep"] = self._raw_data["NU_CEP"].apply(lambda x: x if pd.notna(x) else np.nan)
-        self._data["bairro"] = self._raw_data["NM_BAIRRO"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan)
-        self._data["cod_unidade"] = self._raw_data["ID_UNIDADE"].apply(lambda x: x if pd.notna(x) else np.nan)
-
-        self._data["FONETICA_N"] = self._data["nome"].apply(lambda x: f"{x.split(' ')[0]}{x.split(' ')[-1]}" if pd.notna(x) else np.nan)
-        if sific:
-            self._data["FONETICA_N"] = self._data["nome_mae"].apply(lambda x: f"{x.split(' ')[0]}{x.split(' ')[-1]}" if pd.notna(x) else np.nan)
-            self._data["classif_nascido"] = self._data[["nome", "nome_mae"]].apply(lambda x: x["nome"].replace(x["nome_mae"], '') if pd.notna(x["nome"]) and pd.notna(x["nome_mae"]) and x["nome_mae"] in x["nome"] else x["nome"], axis=1) 
-            self._data["classif_nascido"] = self._data["classif_nascido"].apply(lambda x: x.strip().replace(" DE", ""))
+        return SINAN_SIFIC_COLUMNS if sific else SINAN_COLUMNS
 
-        self._data["nascimento_dia"] = self._data["dt_nasc"].apply(lambda x: x.day if hasattr(x, 'day') and pd.notna(x) else np.nan)
-        self._data["nascimento_mes"] = self._data["dt_nasc"].apply(lambda x: x.month if hasattr(x, 'day') and pd.notna(x) else np.nan)
-        self._data["nascimento_ano"] = self._data["dt_nasc"].apply(lambda x: x.year if hasattr(x, 'day') and pd.notna(x) else np.nan)
+    def matching_standard(self, sific=False, columns=None):
+        '''
+            Standardize the fields used for deduplication and linkage. Each field is computed
+            over the whole column (pandas and Arrow string kernels). Only the requested columns
+            and their dependencies are computed (see 'SINAN_COLUMNS').
 
-        self._data["primeiro_nome"] = self._data["nome"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
-        #self._data["segundo_nome"] = self._data["nome"].apply(lambda x: x.split(" ")[1] if pd.notna(x) and len(x.split(" "))>1 else np.nan )
-        self._data["complemento_nome"] = self._data["nome"].apply(lambda x: ' '.join(x.split(" ")[1:]) if pd.notna(x) and len(x.split(" "))>1 else np.nan )
-        if sific:
-            self._data["primeiro_nome"] = self._data["classif_nascido"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
-            self._data["complemento_nome"] = self._data["classif_nascido"].apply(lambda x: ' '.join(x.split(" ")[2:]) if pd.notna(x) and len(x.split(" "))>2 else np.nan )
-        
-        self._data["primeiro_nome_mae"] = self._data["nome_mae"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
-        self._data["segundo_nome_mae"] = self._data["nome_mae"].apply(lambda x: x.split(" ")[1] if pd.notna(x) and len(x.split(" "))>1 else np.nan )
-        self._data["complemento_nome_mae"] = self._data["nome_mae"].apply(lambda x: ' '.join(x.split(" ")[2:]) if pd.notna(x) and len(x.split(" "))>2 else np.nan )
+            Args:
+            -----
+                sific:
+                    Boolean. Default False. Records of congenital syphilis: names of the newborns
+                    are derived from the names of the mothers.
+                columns:
+                    List of strings. Default None. Derived columns required, e.g. the keys of the 
+                    'compare_rules' and the blocking keys of the linkage (all columns when None).
+        '''
+        return self.compute_columns(columns, sific=sific)
 
     def define_duplicate(self, persons_pairs, delta_notific=None, delta_sintomas=None, same_unit=None):
         '''
-            Description.
+            Split pairs of records of the same person into duplicated notifications (positives)
+            and distinct notifications (negatives). See 'ProcessBase._define_duplicate'.
 
             Args:
             -----
                 persons_pairs:
-                    List.
+                    List of 2-tuples, numpy.array or pandas.MultiIndex.
                 delta_notific:
-                    Integer.
+                    Integer. Maximum number of days between notifications.
                 delta_sintomas:
-                    Integer.
+                    Integer. Maximum number of days between first symptoms.
                 same_unit:
-                    Boolean.
+                    Boolean. Duplicates must be notified by the same unit.
 
             Return:
             -------
                 positives:
-                    List of 2-tuples.
+                    numpy.array of 2 columns (or pandas.MultiIndex).
                 negatives:
-                    List of 2-tuples.
+                    numpy.array of 2 columns (or pandas.MultiIndex).
         '''
-        temp_index = self.raw_data.set_index("ID_GEO")
-
-        positives = []
-        negatives = []
-
-        for pair in persons_pairs:
-            left, right = pair[0], pair[1]
-            
-            dt_not_left, dt_not_right = temp_index["DT_NOTIFIC"].loc[left], temp_index["DT_NOTIFIC"].loc[right]
-            dt_sin_left, dt_sin_right = temp_index["DT_SIN_PRI"].loc[left], temp_index["DT_SIN_PRI"].loc[right]
-            id_not_left, id_not_right = temp_index["ID_UNIDADE"].loc[left], temp_index["ID_UNIDADE"].loc[right]
-
-            cur_delta_not = abs((dt_not_left-dt_not_right).days)
-            cur_delta_sin = abs((dt_sin_left-dt_sin_right).days)
-
-            if cur_delta_not<=delta_notific and cur_delta_not>=0 and cur_delta_sin<=delta_sintomas:
-                if same_unit and id_not_left==id_not_right:
-                    positives.append(pair)
-                elif same_unit and id_not_left!=id_not_right:
-                    negatives.append(pair)
-                else:
-                    positives.append(pair)
-            else:
-                negatives.append(pair)
-        return positives, negatives
+        return self._define_duplicate(persons_pairs, "ID_GEO", "ID_UNIDADE", delta_notific=delta_notific, 
+                                      delta_sintomas=delta_sintomas, same_unit=same_unit)
 
 
 class ProcessSivep_v2(ProcessBase):
@@ -110,81 +146,47 @@ class ProcessSivep_v2(ProcessBase):
     '''
     db_type = "SIVEP-GRIPE"
 
-    def matching_standard(self):
-        '''
-        
-        '''
-        self._data["nome"] = self._raw_data["NM_PACIENT"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan).apply(lambda x: re.sub(' {2,}', ' ', x) if pd.notna(x) else np.nan)
-        self._data["nome_mae"] = self._raw_data["NM_MAE_PAC"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan).apply(lambda x: re.sub(' {2,}', ' ', x) if pd.notna(x) else np.nan)
-        self._data["sexo"] = self._raw_data["CS_SEXO"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan)
-        self._data["dt_nasc"] = self._raw_data["DT_NASC"].apply(lambda x: pd.to_datetime(x, format="%d/%m/%Y", errors="coerce") if not hasattr(x, 'year') and pd.notna(x) else x)
-        self._data["cpf"] = self._raw_data["NU_CPF"].apply(lambda x: f"{x:11.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else x)
-        self._data["cns"] = self._raw_data["NU_CNS"].apply(lambda x: x if isinstance(x, str) and general_utils.cns_is_valid(x) and pd.notna(x) else ( f"{x:13.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else np.nan))
-        self._data["cep"] = self._raw_data["NU_CEP"].apply(lambda x: x if isinstance(x, str) and pd.notna(x) else ( f"{x:8.0f}".replace(" ", "0") if not isinstance(x, str) and pd.notna(x) else np.nan))
-        self._data["bairro"] = self._raw_data["NM_BAIRRO"].apply(lambda x: general_utils.uniformize_name(x.upper().strip(), sep=" ") if pd.notna(x) else np.nan)
-        self._data["cod_unidade"] = self._raw_data["CO_UNI_NOT"].apply(lambda x: x if pd.notna(x) else np.nan)
-
-        self._data["FONETICA_N"] = self._data["nome"].apply(lambda x: f"{x.split(' ')[0]}{x.split(' ')[-1]}" if pd.notna(x) else np.nan)
+    derived_columns = SIVEP_COLUMNS
 
-        self._data["nascimento_dia"] = self._data["dt_nasc"].apply(lambda x: x.day if hasattr(x, 'day') and pd.notna(x) else np.nan)
-        self._data["nascimento_mes"] = self._data["dt_nasc"].apply(lambda x: x.month if hasattr(x, 'day') and pd.notna(x) else np.nan)
-        self._data["nascimento_ano"] = self._data["dt_nasc"].apply(lambda x: x.year if hasattr(x, 'day') and pd.notna(x) else np.nan)
+    def matching_standard(self, columns=None):
+        '''
+            Standardize the fields used for deduplication and linkage. Each field is computed
+            over the whole column (pandas and Arrow string kernels). Only the requested columns
+            and their dependencies are computed (see 'SIVEP_COLUMNS').
 
-        self._data["primeiro_nome"] = self._data["nome"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
-        #self._data["segundo_nome"] = self._data["nome"].apply(lambda x: x.split(" ")[1] if pd.notna(x) and len(x.split(" "))>1 else np.nan )
-        self._data["complemento_nome"] = self._data["nome"].apply(lambda x: ' '.join(x.split(" ")[1:]) if pd.notna(x) and len(x.split(" "))>1 else np.nan )
-        
-        self._data["primeiro_nome_mae"] = self._data["nome_mae"].apply(lambda x: x.split(" ")[0] if pd.notna(x) else np.nan )
-        self._data["segundo_nome_mae"] = self._data["nome_mae"].apply(lambda x: x.split(" ")[1] if pd.notna(x) and len(x.split(" "))>1 else np.nan )
-        self._data["complemento_nome_mae"] = self._data["nome_mae"].apply(lambda x: ' '.join(x.split(" ")[2:]) if pd.notna(x) and len(x.split(" "))>2 else np.nan )
+            Args:
+            -----
+                columns:
+                    List of strings. Default None. Derived columns required, e.g. the keys of the 
+                    'compare_rules' and the blocking keys of the linkage (all columns when None).
+        '''
+        return self.compute_columns(columns)
 
     def define_duplicate(self, persons_pairs, delta_notific=None, delta_sintomas=None, same_unit=None):
         '''
-            Description.
+            Split pairs of records of the same person into duplicated notifications (positives)
+            and distinct notifications (negatives). See 'ProcessBase._define_duplicate'.
 
             Args:
             -----
                 persons_pairs:
-                    List.
+                    List of 2-tuples, numpy.array or pandas.MultiIndex.
                 delta_notific:
-                    Integer.
+                    Integer. Maximum number of days between notifications.
                 delta_sintomas:
-                    Integer.
+                    Integer. Maximum number of days between first symptoms.
                 same_unit:
-                    Boolean.
+                    Boolean. Duplicates must be notified by the same unit.
 
             Return:
             -------
                 positives:
-                    List of 2-tuples.
+                    numpy.array of 2 columns (or pandas.MultiIndex).
                 negatives:
-                    List of 2-tuples.
+                    numpy.array of 2 columns (or pandas.MultiIndex).
         '''
-        temp_index = self.raw_data.set_index("ID_SIVEP")
-
-        positives = []
-        negatives = []
-
-        for pair in persons_pairs:
-            left, right = pair[0], pair[1]
-            
-            dt_not_left, dt_not_right = temp_index["DT_NOTIFIC"].loc[left], temp_index["DT_NOTIFIC"].loc[right]
-            dt_sin_left, dt_sin_right = temp_index["DT_SIN_PRI"].loc[left], temp_index["DT_SIN_PRI"].loc[right]
-            id_not_left, id_not_right = temp_index["CO_UNI_NOT"].loc[left], temp_index["CO_UNI_NOT"].loc[right]
-
-            cur_delta_not = abs((dt_not_left-dt_not_right).days)
-            cur_delta_sin = abs((dt_sin_left-dt_sin_right).days)
-
-            if cur_delta_not<=delta_notific and cur_delta_not>=0 and cur_delta_sin<=delta_sintomas:
-                if same_unit and id_not_left==id_not_right:
-                    positives.append(pair)
-                elif same_unit and id_not_left!=id_not_right:
-                    negatives.append(pair)
-                else:
-                    positives.append(pair)
-            else:
-                negatives.append(pair)
-        return positives, negatives
+        return self._define_duplicate(persons_pairs, "ID_SIVEP", "CO_UNI_NOT", delta_notific=delta_notific, 
+                                      delta_sintomas=delta_sintomas, same_unit=same_unit)
 
 
 '''
@@ -227,7 +229,7 @@ class ProcessSinan(ProcessBase):
  
         # --> Consolidate BAIRROS
         self._data["bairro"] = self._raw_data["NM_BAIRRO"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan)
-        self._data["bairro"] = self._data["bairro"].apply(lambda x: general_utils.uniformize_name(x, sep=" ") if pd.notna(x) else np.nan)
+        self._data["bairro"] = general_utils.uniformize_name_column(self._data["bairro"], sep=" ")
 
         self._data = self._data.drop(["dt_nasc", "dt_notific"], axis=1)
         self._data["evolucao"] = self._raw_data["EVOLUCAO"].copy()
@@ -246,13 +248,13 @@ class ProcessGal(ProcessBase):
         
         '''
         self._data["nome"] = self._raw_data["PACIENTE"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan)
-        self._data["nome_mae"] = self._raw_data["NOME DA MÃE"].apply(lambda x: general_utils.uniformize_name(x, sep=" ") if pd.notna(x) else np.nan)
+        self._data["nome_mae"] = general_utils.uniformize_name_column(self._raw_data["NOME DA MÃE"], sep=" ")
         self._data["sexo"] = self._raw_data["SEXO"].fillna("I").map({"MASCULINO": "M", "FEMININO": "F", "IGNORADO": "I"})
         self._data["cns"] = self._raw_data["CNS DO PACIENTE"].copy()
         self._data["nascimento"] = self._raw_data["DATA DE NASCIMENTO"].apply(lambda x: f"{x.day:2.0f}/{x.month:2.0f}/{x.year:2.0f}".replace(" ", "0") if pd.notna(x) else np.nan)
         self._data["solicitacao"] = self._raw_data["DATA DA SOLICITAÇÃO"].apply(lambda x: f"{x.day:2.0f}/{x.month:2.0f}/{x.year:2.0f}".replace(" ", "0") if pd.notna(x) else np.nan)
         
-        self._data["nome"] = self._data["nome"].apply(lambda x: general_utils.uniformize_name(x, sep=" ") if pd.notna(x) else np.nan)
+        self._data["nome"] = general_utils.uniformize_name_column(self._data["nome"], sep=" ")
 
         self._data["nascimento_dia"] = self._raw_data["DATA DE NASCIMENTO"].apply(lambda x: x.day if pd.notna(x) else np.nan)
         self._data["nascimento_mes"] = self._raw_data["DATA DE NASCIMENTO"].apply(lambda x: x.month if pd.notna(x) else np.nan)
@@ -281,8 +283,8 @@ class ProcessSivep(ProcessBase):
         # --> Generate variables for LINKAGE
         self._data["nome"] = self._raw_data["NM_PACIENT"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan).apply(lambda x: re.sub(' {2,}', ' ', x) if pd.notna(x) else np.nan)
         self._data["nome_mae"] = self._raw_data["NM_MAE_PAC"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan).apply(lambda x: re.sub(' {2,}', ' ', x) if pd.notna(x) else np.nan)
-        self._data["nome_mae"] = self._data["nome_mae"].apply(lambda x: general_utils.uniformize_name(x, sep=" ") if pd.notna(x) else np.nan)
-        self._data["nome"] = self._data["nome"].apply(lambda x: general_utils.uniformize_name(x, sep=" ") if pd.notna(x) else np.nan)
+        self._data["nome_mae"] = general_utils.uniformize_name_column(self._data["nome_mae"], sep=" ")
+        self._data["nome"] = general_utils.uniformize_name_column(self._data["nome"], sep=" ")
 
         self._data["dt_notific"] = pd.to_datetime(self._raw_data["DT_NOTIFIC"], format="%Y-%m-%d", errors="coerce")
         self._data["dt_sin_pri"] = pd.to_datetime(self._raw_data["DT_SIN_PRI"], format="%Y-%m-%d", errors="coerce")
@@ -314,7 +316,7 @@ class ProcessSivep(ProcessBase):
         self._data["complemento_nome_mae"] = self._data["nome_mae"].apply(lambda x: ' '.join(x.split(" ")[2:]) if pd.notna(x) and len(x.split(" "))>2 else np.nan )
 
         self._data["bairro"] = self._raw_data["NM_BAIRRO"].apply(lambda x: x.upper().strip() if pd.notna(x) else np.nan)
-        self._data["bairro"] = self._data["bairro"].apply(lambda x: general_utils.uniformize_name(x, sep=" ") if pd.notna(x) else np.nan)
+        self._data["bairro"] = general_utils.uniformize_name_column(self._data["bairro"], sep=" ")
 
         self._data["evolucao"] = self._raw_data["EVOLUCAO"].copy()
         self._data["classi_fin"] = self._raw_data["CLASSI_FIN"].copy()
@@ -11,6 +11,7 @@
 ''' 
 
 import pandera
+import numpy as np
 import pandas as pd
 from collections import defaultdict
 from pandera import DataFrameSchema, Column
@@ -31,6 +32,7 @@ class DataBase:
         # -- Id created
         self.has_id = False
         self.validated = False
+        self._id_map = None
 
     @property
     def raw_data(self):
@@ -48,6 +50,32 @@ class DataBase:
     def data(self, x):
         raise AttributeError("Not possible to change this attribute.")
 
+    @property
+    def id_map(self):
+        return self._id_map
+
+    @id_map.setter
+    def id_map(self, x):
+        raise AttributeError("Not possible to change this attribute.")
+
+    def _create_surrogate_key(self, id_col):
+        '''
+            Create a dense integer key ('SURROGATE_ID') for the unique identifier of the records,
+            together with the mapping table ('id_map') to translate the keys back to the original 
+            identifiers. Matching and grouping can run over the integer keys, which are cheaper 
+            to store and to hash than the long string identifiers.
+
+            Args:
+            -----
+                id_col:
+                    String. Name of the field holding the unique identifier.
+        '''
+        # --> Missing identifiers get a key of their own (no -1 sentinel), translated back to NaN.
+        codes, uniques = pd.factorize(self._raw_data[id_col], use_na_sentinel=False)
+        dtype = np.int32 if uniques.shape[0]<np.iinfo(np.int32).max else np.int64
+        self._raw_data["SURROGATE_ID"] = codes.astype(dtype)
+        self._id_map = pd.DataFrame({"SURROGATE_ID": np.arange(uniques.shape[0], dtype=dtype), id_col: uniques})
+
 
 '''
     # ----- SINAN data object ----- #
@@ -124,8 +124,9 @@ class DataSinan(DataBase):
         self._raw_data["DT_NOTIFIC_FMT"] = self._raw_data["DT_NOTIFIC"].apply(lambda x: f"{x.day:2.0f}{x.month:2.0f}{x.year}".replace(" ", "0"))
         self._raw_data["ID_MUNICIP"] = self._raw_data["ID_MUNICIP"].apply(lambda x: f"{x}")
         self._raw_data["ID_GEO"] = self._raw_data["ID_AGRAVO"]+self._raw_data["NU_NOTIFIC"]+self._raw_data["ID_MUNICIP"]+self._raw_data["DT_NOTIFIC_FMT"]
+        self._create_surrogate_key("ID_GEO")
         
-        self._data = pd.DataFrame(self._raw_data["ID_GEO"])
+        self._data = self._raw_data[["ID_GEO", "SURROGATE_ID"]].copy()
         self._raw_data = self._raw_data.drop("DT_NOTIFIC_FMT", axis=1)
         self.has_id = True
 
@@ -208,7 +209,8 @@ class DataGal(DataBase):
             nature of the notification process in the system. An exam requisition (one single number) can trigger
             several samples and exams for a single person. Therefore, we create two IDs, one ('GAL_ID') to highlight 
             the notifications inside the whole database, the other ('UNIQUE_ID') to single out each notifications 
-            existent in the specific file provided for analysis.
+            existent in the specific file provided for analysis. A dense integer key ('SURROGATE_ID') is also
+            created for 'UNIQUE_ID' (see 'id_map').
 
             Args:
             -----
@@ -219,8 +221,9 @@ class DataGal(DataBase):
         self._raw_data["GAL_ID"] = self._raw_data["REQUISIÇÃO"]+self._raw_data["DATA DA SOLICITAÇÃO_FMT"]+self._raw_data["CNES UNIDADE SOLICITANTE"]+\
                                    self._raw_data["IBGE MUNICÍPIO SOLICITANTE"]
         self._raw_data["UNIQUE_ID"] = self._raw_data["GAL_ID"]+[ f"{n:8.0f}".replace(" ", "0") for n in range(self._raw_data.shape[0]) ] 
+        self._create_surrogate_key("UNIQUE_ID")
 
-        self._data = self._raw_data[["GAL_ID", "UNIQUE_ID"]].copy()
+        self._data = self._raw_data[["GAL_ID", "UNIQUE_ID", "SURROGATE_ID"]].copy()
         self._raw_data = self._raw_data.drop("DATA DA SOLICITAÇÃO_FMT", axis=1)
         self.has_id = True
 
@@ -290,7 +293,8 @@ class DataSivep(DataBase):
         
         '''
         self._raw_data["ID_SIVEP"] = self._raw_data["NU_NOTIFIC"].copy()
-        self._data = pd.DataFrame(self._raw_data["ID_SIVEP"])
+        self._create_surrogate_key("ID_SIVEP")
+        self._data = self._raw_data[["ID_SIVEP", "SURROGATE_ID"]].copy()
         self.has_id = True
 
 
@@ -10,8 +10,11 @@
 # --> Lib
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from tqdm import tqdm
 from unidecode import unidecode
+from itertools import islice
 from collections import defaultdict
 
 
@@ -43,6 +46,315 @@ def uniformize_name(string, sep=''):
     return new_string
 
 
+# --> Maximum number of normalised values kept by each normalisation cache.
+NORMALISATION_CACHE_SIZE = 1000000
+
+class NormalisationCache:
+    '''
+        Bounded cache of normalised values. Each column is factorized and only its unique 
+        values absent from the cache are normalised; the results are then mapped back to the
+        rows. The cache is kept between calls, so repeated values across columns, chunks and
+        databases are normalised once. When full, the oldest entries are evicted first.
+
+        Args:
+        -----
+            func:
+                Function. Normalisation of a pandas.Series of unique non-missing values, returning
+                a pandas.Series (or array) of the same length.
+            maxsize:
+                Integer. Default NORMALISATION_CACHE_SIZE. Maximum number of cached values.
+    '''
+    def __init__(self, func, maxsize=NORMALISATION_CACHE_SIZE) -> None:
+        self.func = func
+        self.maxsize = maxsize
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        self._cache = {}
+
+    def __call__(self, values):
+        '''
+            Normalise a column. Missing values are kept as NaN.
+
+            Args:
+            -----
+                values:
+                    pandas.Series.
+            Return:
+            -------
+                normalised:
+                    pandas.Series.
+        '''
+        valid = values.notna().to_numpy()
+        codes, uniques = pd.factorize(values[valid])
+        uniques = np.asarray(uniques, dtype=object)
+
+        missing = object()
+        normalised = np.array([ self._cache.get(value, missing) for value in uniques ], dtype=object)
+        to_compute = np.fromiter((value is missing for value in normalised), dtype=bool, count=normalised.shape[0])
+        if to_compute.any():
+            computed = np.asarray(self.func(pd.Series(uniques[to_compute], dtype=object)), dtype=object)
+            normalised[to_compute] = computed
+            self._store(uniques[to_compute], computed)
+        return fill_missing(normalised[codes], valid, values.index)
+
+    def _store(self, keys, values):
+        '''
+            Add new entries, evicting the oldest ones beyond 'maxsize'.
+        '''
+        if len(keys)>=self.maxsize:
+            keys, values = keys[-self.maxsize:], values[-self.maxsize:]
+        excess = len(self._cache)+len(keys)-self.maxsize
+        if excess>0:
+            for key in list(islice(self._cache, excess)):
+                del self._cache[key]
+        self._cache.update(zip(keys.tolist(), values.tolist()))
+
+_normalisation_caches = {}
+
+def normalisation_cache(name, func):
+    '''
+        Shared normalisation cache registered under 'name' (created on first use).
+    '''
+    if name not in _normalisation_caches:
+        _normalisation_caches[name] = NormalisationCache(func)
+    return _normalisation_caches[name]
+
+def clear_normalisation_caches():
+    '''
+        Empty all the shared normalisation caches (e.g. between benchmark runs).
+    '''
+    for cache in _normalisation_caches.values():
+        cache.clear()
+
+def uniformize_name_column(values, sep=''):
+    '''
+        Apply 'uniformize_name' to a whole column, normalising each unique value once (through
+        a shared normalisation cache). Missing values are kept as NaN.
+
+        Args:
+        -----
+            values:
+                pandas.Series. Input names to uniformize.
+            sep:
+                String. Separator for different chunks of the string.
+        Return:
+        -------
+            new_names:
+                pandas.Series. Final names.
+    '''
+    cache = normalisation_cache(("uniformize_name", sep), lambda uniques: uniques.map(lambda x: uniformize_name(x, sep=sep)))
+    return cache(values)
+
+def uniformize_names(names, squeeze_spaces=False):
+    '''
+        Vectorised version of 'uniformize_name' (with sep=' ') over a whole column, after
+        uppercasing and stripping each value. Unique values are normalised once (through a 
+        shared normalisation cache). Missing values are kept as NaN.
+
+        Args:
+        -----
+            names:
+                pandas.Series. Input names to uniformize.
+            squeeze_spaces:
+                Boolean. Default False. Collapse repeated spaces into a single space.
+        Return:
+        -------
+            new_names:
+                pandas.Series. Final names.
+    '''
+    cache = normalisation_cache(("uniformize_names", squeeze_spaces), lambda uniques: _uniformize_names(uniques, squeeze_spaces))
+    return cache(names)
+
+def _uniformize_names(names, squeeze_spaces=False):
+    '''
+        String kernels of 'uniformize_names' over non-missing names.
+    '''
+    new_names = names.str.upper().str.strip().str.replace(r"[^\w ]|_", "", regex=True)
+
+    # --> Only non-ASCII names need transliteration ('unidecode' maps character by character).
+    non_ascii = new_names.str.contains(r"[^\x00-\x7f]", regex=True).to_numpy(dtype=bool)
+    if non_ascii.any():
+        chars = set("".join(new_names[non_ascii]))
+        table = { ord(char): unidecode(char) for char in chars if ord(char)>127 }
+        new_names[non_ascii] = new_names[non_ascii].str.translate(table)
+    if squeeze_spaces:
+        new_names = new_names.str.replace(r" {2,}", " ", regex=True)
+    return new_names
+
+def fill_missing(values, valid, index):
+    '''
+        Scatter 'values' into a column of NaN at the 'valid' positions, with the dtype inference 
+        of 'pandas.Series.apply'.
+
+        Args:
+        -----
+            values:
+                pandas.Series or numpy.array. Values of the valid positions.
+            valid:
+                numpy.array. Boolean mask of the valid positions.
+            index:
+                pandas.Index. Index of the final column.
+        Return:
+        -------
+            column:
+                pandas.Series.
+    '''
+    column = np.full(valid.shape[0], np.nan, dtype=object)
+    column[valid] = np.asarray(values, dtype=object)
+    return pd.Series(column, index=index).infer_objects()
+
+def extract_pattern(strings, pattern):
+    '''
+        Extract the first capture group of a regular expression (RE2 syntax) from each string 
+        of a column, through Arrow compute kernels. Values without a match are set to NaN.
+
+        Args:
+        -----
+            strings:
+                pandas.Series. Strings (or missing values).
+            pattern:
+                String. Regular expression with a single named capture group.
+        Return:
+        -------
+            extracted:
+                pandas.Series.
+    '''
+    arr = pa.array(strings.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    extracted = pc.extract_regex(arr, pattern)
+    valid = extracted.is_valid().to_numpy(zero_copy_only=False)
+    return fill_missing(extracted.field(0).to_numpy(zero_copy_only=False)[valid], valid, strings.index)
+
+def numeric_codes(values, width):
+    '''
+        Vectorised version of 'f"{x:{width}.0f}".replace(" ", "0")' over the numeric (non-string,
+        non-missing) values of a column. Other values are set to NaN.
+
+        Args:
+        -----
+            values:
+                pandas.Series. Codes stored as numbers (e.g. CNS, CPF or CEP).
+            width:
+                Integer. Minimum number of digits.
+        Return:
+        -------
+            codes:
+                pandas.Series.
+    '''
+    numeric = is_numeric(values).to_numpy()
+    numbers = pd.to_numeric(values[numeric]).to_numpy(dtype=np.float64)
+    codes = np.empty(numbers.shape[0], dtype=object)
+
+    # --> Non-negative numbers within the int64 range are formatted through integers.
+    fast = np.isfinite(numbers) & (numbers>=0) & (numbers<2**62)
+    codes[fast] = pd.Series(np.rint(numbers[fast]).astype(np.int64)).astype(str).str.rjust(width, "0").to_numpy()
+    codes[~fast] = [ f"{x:{width}.0f}".replace(" ", "0") for x in numbers[~fast] ]
+    return fill_missing(codes, numeric, values.index)
+
+def is_string(values):
+    '''
+        Boolean mask of the values of a column that are strings.
+    '''
+    return pd.Series(np.fromiter((isinstance(x, str) for x in values), dtype=bool, count=values.shape[0]), index=values.index)
+
+def is_numeric(values):
+    '''
+        Boolean mask of the values of a column that are not strings nor missing.
+    '''
+    return values.notna() & ~is_string(values)
+
+def keep_valid(values):
+    '''
+        Vectorised version of 'x if pd.notna(x) else np.nan' over a whole column.
+    '''
+    valid = values.notna().to_numpy()
+    return fill_missing(values[valid], valid, values.index)
+
+def upper_strip(values):
+    '''
+        Vectorised version of 'x.upper().strip() if pd.notna(x) else np.nan' over a whole column.
+    '''
+    valid = values.notna().to_numpy()
+    return fill_missing(values[valid].str.upper().str.strip(), valid, values.index)
+
+def standard_codes(values, width, validator=None):
+    '''
+        Standardize a column of codes (e.g. CNS or CEP) stored as strings or numbers: strings are
+        kept (when valid), numbers are formatted with 'width' digits (see 'numeric_codes') and
+        any other value is set to NaN.
+
+        Args:
+        -----
+            values:
+                pandas.Series.
+            width:
+                Integer. Minimum number of digits of the numeric codes.
+            validator:
+                Function. Default None. Bulk validator of the string codes (e.g. 'cns_valid_mask'):
+                receives a pandas.Series and returns a boolean mask. Evaluated over the unique values.
+        Return:
+        -------
+            codes:
+                pandas.Series.
+    '''
+    keep = is_string(values)
+    if validator is not None:
+        unique_strings = pd.Series(values[keep].unique(), dtype=object)
+        keep = keep & values.isin(unique_strings[validator(unique_strings).to_numpy()])
+    codes = numeric_codes(values, width).astype(object)
+    codes[keep] = values[keep]
+    return codes.infer_objects()
+
+def parse_dates(values, format="%d/%m/%Y"):
+    '''
+        Parse the dates of a column stored as strings, keeping the values that are already dates.
+
+        Args:
+        -----
+            values:
+                pandas.Series.
+            format:
+                String. Default '%d/%m/%Y'.
+        Return:
+        -------
+            dates:
+                pandas.Series.
+    '''
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.copy()
+    valid = values.notna().to_numpy()
+    is_date = np.fromiter((hasattr(x, 'year') for x in values), dtype=bool, count=values.shape[0])
+    dates = values.to_numpy(dtype=object).copy()
+    to_parse = valid & ~is_date
+    if to_parse.any():
+        dates[to_parse] = np.asarray(pd.to_datetime(values[to_parse], format=format, errors="coerce"), dtype=object)
+    return pd.Series(dates, index=values.index).infer_objects()
+
+def date_part(dates, part):
+    '''
+        Day, month or year of each date of a column (NaN for missing dates).
+
+        Args:
+        -----
+            dates:
+                pandas.Series.
+            part:
+                String. {'day', 'month', 'year'}.
+        Return:
+        -------
+            parts:
+                pandas.Series.
+    '''
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        valid = np.fromiter((hasattr(x, 'day') and pd.notna(x) for x in dates), dtype=bool, count=dates.shape[0])
+        return fill_missing([ getattr(x, part) for x in dates[valid] ], valid, dates.index)
+    valid = dates.notna().to_numpy()
+    return fill_missing(getattr(dates[valid].dt, part).astype(np.int64), valid, dates.index)
+
+
 def cns_is_valid(cns):
     """
     Função para validar número do CNS - Cartão Nacional de Saúde ou Cartão do SUS
@@ -63,6 +375,114 @@ def cns_is_valid(cns):
     ) % 11 == 0
 
 
+def cpf_is_valid(cpf):
+    """
+    Função para validar número do CPF - Cadastro de Pessoas Físicas
+    
+    :param cpf: Número de CPF que será validado
+    :type cpf: String (Caso não seja, será transformado)
+    :rtype: Boolean
+    """
+    cpf = ''.join(filter(str.isdigit, str(cpf)))
+
+    if len(cpf) != 11:
+        return False
+    if cpf==cpf[0]*11:
+        return False
+
+    for n in (9, 10):
+        digit = sum(
+            [int(cpf[i]) * (n + 1 - i) for i in range(n)]
+        ) * 10 % 11 % 10
+        if digit != int(cpf[n]):
+            return False
+    return True
+
+
+def digit_matrix(values, n_digits):
+    '''
+        Digits of the identifiers of a column (non-digit characters are discarded, as in 
+        'cns_is_valid') as a matrix of uint8, for the identifiers with exactly 'n_digits' digits.
+
+        Args:
+        -----
+            values:
+                pandas.Series. Identifiers (strings or numbers).
+            n_digits:
+                Integer. Number of digits of the identifier.
+        Return:
+        -------
+            candidates:
+                numpy.array. Boolean mask of the identifiers with 'n_digits' digits.
+            digits:
+                numpy.array. uint8 matrix (candidates x n_digits) of the digits.
+    '''
+    valid = values.notna().to_numpy()
+    strings = values[valid].astype(str)
+
+    # --> Non-ASCII decimal digits are converted to their ASCII counterpart beforehand.
+    non_ascii = strings.str.contains(r"[^\x00-\x7f]", regex=True).to_numpy(dtype=bool)
+    if non_ascii.any():
+        cleaned = strings[non_ascii].str.replace(r"\D", "", regex=True)
+        chars = set("".join(cleaned))
+        strings[non_ascii] = cleaned.str.translate({ ord(char): str(int(char)) for char in chars })
+
+    # --> Digits extracted with Arrow kernels; the matrix is read from the data buffer.
+    digits = pc.replace_substring_regex(pa.array(strings.to_numpy(dtype=object), type=pa.string()), r"[^0-9]", "")
+    has_digits = pc.equal(pc.binary_length(digits), n_digits).to_numpy(zero_copy_only=False)
+    digits = pc.filter(digits, has_digits)
+
+    candidates = np.zeros(values.shape[0], dtype=bool)
+    candidates[np.flatnonzero(valid)[has_digits]] = True
+    if len(digits)==0:
+        return candidates, np.zeros((0, n_digits), dtype=np.uint8)
+    offsets = np.frombuffer(digits.buffers()[1], dtype=np.int32)[digits.offset:digits.offset+len(digits)+1]
+    matrix = np.frombuffer(digits.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]].reshape(-1, n_digits) - ord("0")
+    return candidates, matrix
+
+def cns_valid_mask(values):
+    '''
+        Vectorised version of 'cns_is_valid' over a whole column: weighted mod-11 checksum of 
+        the 15 digits computed over a matrix of digits.
+
+        Args:
+        -----
+            values:
+                pandas.Series. CNS numbers.
+        Return:
+        -------
+            mask:
+                pandas.Series. True for the valid CNS.
+    '''
+    candidates, digits = digit_matrix(values, 15)
+    checksum = digits.astype(np.int64) @ np.arange(15, 0, -1)
+    mask = np.zeros(values.shape[0], dtype=bool)
+    mask[candidates] = (checksum%11==0) & digits.any(axis=1)
+    return pd.Series(mask, index=values.index)
+
+def cpf_valid_mask(values):
+    '''
+        Vectorised version of 'cpf_is_valid' over a whole column: both check digits computed
+        over a matrix of digits.
+
+        Args:
+        -----
+            values:
+                pandas.Series. CPF numbers.
+        Return:
+        -------
+            mask:
+                pandas.Series. True for the valid CPF.
+    '''
+    candidates, digits = digit_matrix(values, 11)
+    digits = digits.astype(np.int64)
+    first = (digits[:, :9] @ np.arange(10, 1, -1))*10%11%10
+    second = (digits[:, :10] @ np.arange(11, 1, -1))*10%11%10
+    mask = np.zeros(values.shape[0], dtype=bool)
+    mask[candidates] = (digits!=digits[:, :1]).any(axis=1) & (first==digits[:, 9]) & (second==digits[:, 10])
+    return pd.Series(mask, index=values.index)
+
+
 
 def process_bairros():
     '''
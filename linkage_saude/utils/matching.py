@@ -4,12 +4,17 @@ import json
 import random
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import recordlinkage
 import seaborn as sns
-from tqdm import tqdm
 import matplotlib.pyplot as plt
 from collections import defaultdict
+from collections.abc import Mapping
+from itertools import islice
+from recordlinkage.index import SortedNeighbourhood
 
 from linkage_saude.exceptions import *
+import linkage_saude.utils.general as general_utils
 
 '''
     -------------------------------------------------
@@ -121,12 +126,609 @@ def show_pair(pairs, left_df, right_df=None,
     if right_df is not None and right_cols is None:
         raise ValueError("Subset of columns' names must be parsed.")
 
+    # --> Only the records of the pair are projected (see 'PairBrowser' for repeated inspection).
     if temp_right is None:
-        display_df = pd.concat( [temp_left[left_cols].loc[left_index], temp_left[left_cols].loc[right_index]], axis=1 )
+        display_df = pd.concat( [temp_left.loc[left_index, left_cols], temp_left.loc[right_index, left_cols]], axis=1 )
     else:
-        display_df = pd.concat( [temp_left[left_cols].loc[left_index], temp_right[right_cols].loc[right_index]], axis=1 )
+        display_df = pd.concat( [temp_left.loc[left_index, left_cols], temp_right.loc[right_index, right_cols]], axis=1 )
     return display_df 
 
+class PairBrowser:
+    '''
+        Browse the pairs of records obtained by the matching. The pairs are resolved into 
+        positions and the columns are projected once, so each pair is displayed in constant time.
+
+        Args:
+        -----
+            pairs:
+                List of 2-tuples or pandas.MultiIndex.
+            left_df:
+                pandas.DataFrame.
+            right_df:
+                pandas.DataFrame. Default None.
+            left_cols:
+                List.
+            right_cols:
+                List. Default None.
+            random_state:
+                Integer. Default None.
+    '''
+    def __init__(self, pairs, left_df, right_df=None, left_cols=None, right_cols=None, random_state=None) -> None:
+        # --> Verify for columns
+        if left_df is not None and left_cols is None:
+            raise ValueError("Subset of columns' names must be parsed.")
+        if right_df is not None and right_cols is None:
+            raise ValueError("Subset of columns' names must be parsed.")
+        if right_df is None:
+            right_df, right_cols = left_df, left_cols
+
+        if isinstance(pairs, pd.MultiIndex):
+            left_keys, right_keys = pairs.get_level_values(0), pairs.get_level_values(1)
+        else:
+            left_keys, right_keys = [ pair[0] for pair in pairs ], [ pair[1] for pair in pairs ]
+
+        self._left_pos, self._right_pos = left_df.index.get_indexer(left_keys), right_df.index.get_indexer(right_keys)
+        if (self._left_pos==-1).any() or (self._right_pos==-1).any():
+            raise KeyError("Pairs contain records not found in the databases.")
+        self._left, self._right = left_df[left_cols], right_df[right_cols]
+        self._rng = np.random.default_rng(random_state)
+        self._current = 0
+
+    def __len__(self):
+        return self._left_pos.shape[0]
+
+    def __getitem__(self, i):
+        '''
+            Side-by-side records of the i-th pair.
+        '''
+        return pd.concat( [self._left.iloc[self._left_pos[i]], self._right.iloc[self._right_pos[i]]], axis=1 )
+
+    def random(self):
+        '''
+            Side-by-side records of a random pair.
+        '''
+        return self[self._rng.integers(len(self))]
+
+    def next(self):
+        '''
+            Side-by-side records of the next pair (sequential access, restarting at the end).
+        '''
+        display_df = self[self._current]
+        self._current = (self._current+1)%len(self)
+        return display_df
+
+    def batch(self, n, shuffle=True):
+        '''
+            Side-by-side records of 'n' pairs (random pairs when 'shuffle', otherwise the next 
+            ones), as a single dataframe with the pair number as the first level of the columns.
+        '''
+        if shuffle:
+            selected = self._rng.choice(len(self), size=min(n, len(self)), replace=False)
+        else:
+            selected = (self._current+np.arange(min(n, len(self))))%len(self)
+            self._current = (selected[-1]+1)%len(self)
+        return pd.concat([ self[i] for i in selected ], axis=1, keys=selected.tolist())
+
+
+'''
+    -------------------------------------------------
+    ------------------- BLOCKING --------------------
+    ------------------------------------------------- 
+'''
+
+def sorting_key_ranks(blocking_var, left_df, right_df=None):
+    '''
+        Rank the records of the databases according to the sorted unique values of the
+        blocking variable (the same ordering used by the sorted neighbourhood algorithm).
+
+        Args:
+        -----
+            blocking_var:
+                String. Name of the field regarding the blocking variable.
+            left_df:
+                pandas.DataFrame.
+            right_df:
+                pandas.DataFrame. Default None.
+        Return:
+        -------
+            sorting_key_values:
+                numpy.array. Sorted unique values of the blocking variable over both databases.
+            left_ranks:
+                numpy.array. Position of each left record in 'sorting_key_values' (-1 if missing).
+            right_ranks:
+                numpy.array. Position of each right record in 'sorting_key_values' (-1 if missing).
+                None when 'right_df' is None.
+    '''
+    left_keys = left_df[blocking_var]
+    if right_df is None:
+        sorting_key_values = np.unique(left_keys.dropna().values)
+    else:
+        right_keys = right_df[blocking_var]
+        sorting_key_values = np.unique(np.concatenate([left_keys.dropna().values, right_keys.dropna().values]))
+
+    key_index = pd.Index(sorting_key_values)
+    left_ranks = key_index.get_indexer(left_keys)
+    right_ranks = None
+    if right_df is not None:
+        right_ranks = key_index.get_indexer(right_keys)
+    return sorting_key_values, left_ranks, right_ranks
+
+def blocking_partitions(ranks, n_keys, chunksize):
+    '''
+        Split the sorted blocking keys into contiguous ranges of keys holding, each one,
+        at most 'chunksize' records. A single key with more than 'chunksize' records
+        forms its own partition.
+
+        Args:
+        -----
+            ranks:
+                numpy.array. Rank of each record over the sorted blocking keys (-1 if missing).
+            n_keys:
+                Integer. Number of unique blocking keys.
+            chunksize:
+                Integer. Maximum number of records for each partition.
+        Return:
+        -------
+            bounds:
+                List of 2-tuples. Each tuple holds the first (inclusive) and last (exclusive)
+                ranks of the keys of the partition.
+    '''
+    counts = np.bincount(ranks[ranks>=0], minlength=n_keys)
+    cum_counts = np.cumsum(counts)
+
+    bounds = []
+    start = 0
+    while start<n_keys:
+        offset = cum_counts[start-1] if start>0 else 0
+        end = int(np.searchsorted(cum_counts, offset+chunksize, side="right"))
+        end = max(end, start+1)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+def blocking_rules(blocking_var, window=1):
+    '''
+        Normalize the blocking definition into a list of blocking rules.
+
+        Args:
+        -----
+            blocking_var:
+                String or List. Name of the blocking variable, or a list of blocking rules.
+                Each rule of the list is either the name of a blocking variable (using the
+                default 'window') or a 2-tuple (blocking variable, window).
+            window:
+                Odd Integer. Default window for the sorted neighborhood blocking algorithm.
+        Return:
+        -------
+            rules:
+                List of 2-tuples. (blocking variable, window) for each blocking pass.
+    '''
+    if isinstance(blocking_var, str):
+        return [(blocking_var, window)]
+
+    rules = []
+    for rule in blocking_var:
+        if isinstance(rule, str):
+            rules.append((rule, window))
+        else:
+            rules.append((rule[0], rule[1]))
+    return rules
+
+def partitioned_candidates(rules, chunksize, left_df, right_df=None):
+    '''
+        Generate the candidate pairs of the sorted neighbourhood blocking partition by partition.
+
+        The sorted blocking keys are split into ranges (see 'blocking_partitions'). For
+        deduplication, each partition is indexed together with the (window-1)/2 keys preceding
+        it and only the pairs not already produced by the previous partition are kept. For
+        linkage, the right database is partitioned and each partition is indexed against the
+        slice of the left database whose keys fall inside the window. In both cases the union
+        of all partitions is the same set of pairs obtained by indexing the full databases.
+
+        When several blocking rules are given, the passes are performed in order and the pairs
+        already produced by a previous rule (both keys inside the window of that rule) are dropped, 
+        so each pair is generated only once.
+
+        Args:
+        -----
+            rules:
+                List of 2-tuples. (blocking variable, window) for each blocking pass 
+                (see 'blocking_rules').
+            chunksize:
+                Integer. Maximum number of records (of the right database, for linkage)
+                for each partition. When None, each pass is a single partition.
+            left_df:
+                pandas.DataFrame. Only the blocking variables are needed.
+            right_df:
+                pandas.DataFrame. Default None (deduplication). Only the blocking variables are needed.
+        Return:
+        -------
+            generator of 3-tuples:
+                (candidate_links, left_positions, right_positions). Positions (numpy.array) of the 
+                records of the partition in each database. 'right_positions' is None for deduplication.
+    '''
+    previous_passes = []
+    for blocking_var, window in rules:
+        half = int((window-1)/2)
+        sorting_key_values, left_ranks, right_ranks = sorting_key_ranks(blocking_var, left_df, right_df)
+
+        indexer = recordlinkage.Index()
+        indexer.add(SortedNeighbourhood(blocking_var, blocking_var, window=window, sorting_key_values=sorting_key_values))
+
+        ranks = left_ranks if right_df is None else right_ranks
+        pass_chunksize = chunksize if chunksize is not None else ranks.shape[0]+1
+        for start, end in blocking_partitions(ranks, sorting_key_values.shape[0], pass_chunksize):
+            if right_df is None:
+                # --> Deduplication: keys preceding the partition are included to close the window (records
+                # --> with missing keys, rank -1, are never included).
+                left_positions = np.flatnonzero((left_ranks>=max(start-half, 0)) & (left_ranks<end))
+                if left_positions.shape[0]<2:
+                    continue
+                candidate_links = indexer.index(left_df.iloc[left_positions])
+
+                # ----> Pairs with both records before 'start' belong to the previous partition.
+                chunk_ranks = left_ranks[left_positions]
+                last_rank = np.maximum(chunk_ranks[candidate_links.codes[0]], chunk_ranks[candidate_links.codes[1]])
+                candidate_links = candidate_links[last_rank>=start]
+                right_positions = None
+                pair_left, pair_right = left_positions[candidate_links.codes[0]], left_positions[candidate_links.codes[1]]
+            else:
+                # --> Linkage: right records inside the partition against the left records inside the window.
+                right_positions = np.flatnonzero((right_ranks>=start) & (right_ranks<end))
+                left_positions = np.flatnonzero((left_ranks>=max(start-half, 0)) & (left_ranks<end+half))
+                if left_positions.shape[0]==0 or right_positions.shape[0]==0:
+                    continue
+                candidate_links = indexer.index(left_df.iloc[left_positions], right_df.iloc[right_positions])
+                pair_left, pair_right = left_positions[candidate_links.codes[0]], right_positions[candidate_links.codes[1]]
+
+            # --> Remove pairs already generated by the previous blocking passes.
+            if len(previous_passes) and len(candidate_links):
+                seen = np.zeros(len(candidate_links), dtype=bool)
+                for prev_half, prev_left_ranks, prev_right_ranks in previous_passes:
+                    a, b = prev_left_ranks[pair_left], prev_right_ranks[pair_right]
+                    seen |= (a>=0) & (b>=0) & (np.abs(a-b)<=prev_half)
+                candidate_links = candidate_links[~seen]
+
+            if len(candidate_links):
+                yield candidate_links, left_positions, right_positions
+
+        previous_passes.append((half, left_ranks, left_ranks if right_df is None else right_ranks))
+
+def blocking_candidates(rules, left_df, right_df=None):
+    '''
+        Candidate pairs of all blocking passes, merged into a single index without duplicates.
+
+        Args:
+        -----
+            rules:
+                List of 2-tuples. (blocking variable, window) for each blocking pass.
+            left_df:
+                pandas.DataFrame.
+            right_df:
+                pandas.DataFrame. Default None (deduplication).
+        Return:
+        -------
+            candidate_links:
+                pandas.MultiIndex.
+    '''
+    links = [ candidate_links for candidate_links, _, _ in partitioned_candidates(rules, None, left_df, right_df) ]
+    if len(links)==0:
+        return pd.MultiIndex.from_arrays([[], []])
+    candidate_links = links[0]
+    if len(links)>1:
+        candidate_links = candidate_links.append(links[1:])
+    return candidate_links
+
+def valid_keys(keys, validator=None):
+    '''
+        Keep only the valid values of an identifier field (e.g. CNS or CPF). Invalid values
+        are set to NaN. The validator is evaluated once for each unique value.
+
+        Args:
+        -----
+            keys:
+                pandas.Series. Values of the identifier field.
+            validator:
+                Function. Default None. Bulk validator (e.g. 'general_utils.cns_valid_mask'): 
+                receives a pandas.Series and returns a boolean mask of the valid values. When 
+                None, only missing values are discarded.
+        Return:
+        -------
+            keys:
+                pandas.Series.
+    '''
+    if validator is None:
+        return keys
+    unique_keys = pd.Series(keys.dropna().unique(), dtype=object)
+    return keys.where(keys.isin(unique_keys[validator(unique_keys).to_numpy()]))
+
+def exact_key_pairs(left_keys, right_keys=None):
+    '''
+        Hash-join the records sharing the same (valid) identifier.
+
+        For linkage, every left record is paired with every right record holding the same
+        key. For deduplication, each record is paired with the first record (in the order 
+        of the database) holding the same key, which is kept as the representative of the group.
+
+        Args:
+        -----
+            left_keys:
+                pandas.Series. Identifier of the left records (index with the record IDs).
+            right_keys:
+                pandas.Series. Default None (deduplication). Identifier of the right records.
+        Return:
+        -------
+            pairs:
+                pandas.DataFrame. Matched pairs with columns "left_id" and "right_id".
+            resolved_left:
+                pandas.Index. Left records resolved by the exact matching (for deduplication,
+                all records of the group but the representative).
+            resolved_right:
+                pandas.Index. Right records resolved by the exact matching. None for deduplication.
+    '''
+    left_keys = left_keys.dropna()
+    if right_keys is None:
+        ids = pd.Series(left_keys.index, index=left_keys.index)
+        representative = ids.groupby(left_keys.values).transform("first")
+        duplicated = (ids!=representative).values
+        pairs = pd.DataFrame({"left_id": ids.values[duplicated], "right_id": representative.values[duplicated]})
+        return pairs, pd.Index(pairs["left_id"].unique()), None
+
+    right_keys = right_keys.dropna()
+    pairs = pd.merge(pd.DataFrame({"left_id": left_keys.index, "key": left_keys.values}),
+                     pd.DataFrame({"right_id": right_keys.index, "key": right_keys.values}), on="key")
+    pairs = pairs[["left_id", "right_id"]]
+    return pairs, pd.Index(pairs["left_id"].unique()), pd.Index(pairs["right_id"].unique())
+
+def compute_features(compare_cl, candidate_links, left_df, right_df=None, cascade=None):
+    '''
+        Compute the comparison features of the candidate pairs. Defined at module level
+        so it can be dispatched to worker processes.
+
+        Args:
+        -----
+            compare_cl:
+                recordlinkage.Compare. Comparison rules (see 'MatchingBase.set_linkage').
+            candidate_links:
+                pandas.MultiIndex. Pairs of records to be compared.
+            left_df:
+                pandas.DataFrame.
+            right_df:
+                pandas.DataFrame. Default None (deduplication).
+            cascade:
+                Dictionary. Default None. Cascaded comparison settings (see 'MatchingBase.set_linkage'):
+                the 'exact' rules are computed first and only the pairs whose score can still reach
+                'min_score' (assuming a full score on the 'n_string' string rules) are compared through
+                the 'string' rules. The other pairs are dropped from the result.
+        Return:
+        -------
+            features:
+                pandas.DataFrame. Comparison matrix of the candidate pairs.
+    '''
+    if cascade is None:
+        if right_df is None:
+            return compare_cl.compute(candidate_links, left_df)
+        return compare_cl.compute(candidate_links, left_df, right_df)
+
+    # --> Cheap exact rules first.
+    exact_features = compute_features(cascade["exact"], candidate_links, left_df, right_df)
+    reachable = (exact_features.sum(axis=1)+cascade["n_string"]>=cascade["min_score"]).values
+    exact_features, candidate_links = exact_features[reachable], candidate_links[reachable]
+
+    # --> String similarities only for the pairs that can still be a potential match.
+    string_features = compute_features(cascade["string"], candidate_links, left_df, right_df)
+    return pd.concat([exact_features, string_features], axis=1)[cascade["labels"]]
+
+def write_record_store(df, columns, path):
+    '''
+        Export the selected columns (and the index) of the database to an Arrow IPC file,
+        so worker processes can memory-map the records instead of receiving a pickled copy.
+
+        Args:
+        -----
+            df:
+                pandas.DataFrame.
+            columns:
+                List. Columns to be exported (usually the linkage variables).
+            path:
+                String. Path of the Arrow IPC file.
+        Return:
+        -------
+            None.
+    '''
+    table = pa.Table.from_pandas(df[columns], preserve_index=True)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def read_record_store(path, positions=None):
+    '''
+        Attach to an Arrow IPC file created by 'write_record_store'. The file is memory-mapped
+        (zero-copy) and only the rows in 'positions' are converted to pandas.
+
+        Args:
+        -----
+            path:
+                String. Path of the Arrow IPC file.
+            positions:
+                numpy.array. Default None. Positions of the records to be read. All records
+                are read when None.
+        Return:
+        -------
+            df:
+                pandas.DataFrame.
+    '''
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        if positions is not None:
+            table = table.take(pa.array(positions))
+        return table.to_pandas()
+
+def apply_threshold(features, threshold, columns=None, scales=None):
+    '''
+        Reduce to zero all field scores less than 'threshold'. The scores are replaced column 
+        by column, so neither a mask nor a copy of the whole comparison matrix is allocated.
+
+        Args:
+        -----
+            features:
+                pandas.DataFrame. Comparison matrix (modified in place).
+            threshold:
+                Float. Default None. Nothing is done when None or larger than one.
+            columns:
+                List. Default None. Score columns. All columns are used when None.
+            scales:
+                Dictionary. Default None. Scale factor of quantised score columns 
+                (see 'compact_features').
+        Return:
+        -------
+            features:
+                pandas.DataFrame.
+    '''
+    if threshold is None or threshold>1.0:
+        return features
+    if columns is None:
+        columns = features.columns
+    if scales is None:
+        scales = {}
+    for col in columns:
+        scores = features[col].to_numpy()
+        features[col] = np.where(scores<threshold*scales.get(col, 1), scores.dtype.type(0), scores)
+    return features
+
+def compact_features(features, left_index, right_index=None, string_vars=[], similarity="float16"):
+    '''
+        Compact representation of a comparison matrix: pairs are stored as int32 positions
+        into the left and right databases ("left_pos", "right_pos") instead of a MultiIndex
+        of IDs, exact-rule scores as uint8 and similarity scores as float16 or quantised uint8.
+
+        Args:
+        -----
+            features:
+                pandas.DataFrame. Comparison matrix as returned by 'compute_features'.
+            left_index:
+                pandas.Index. IDs of the left database.
+            right_index:
+                pandas.Index. Default None (deduplication). IDs of the right database.
+            string_vars:
+                List. Score columns holding similarities (the 'string' rules).
+            similarity:
+                String. {'float16', 'uint8'}. Storage of the similarity scores. 'uint8' 
+                quantises the scores into 0-255.
+        Return:
+        -------
+            compact:
+                pandas.DataFrame.
+    '''
+    if right_index is None:
+        right_index = left_index
+    pairs = features.index
+    compact = pd.DataFrame({
+        "left_pos": left_index.get_indexer(pairs.levels[0])[pairs.codes[0]].astype(np.int32),
+        "right_pos": right_index.get_indexer(pairs.levels[1])[pairs.codes[1]].astype(np.int32),
+    })
+    for col in features.columns:
+        scores = np.nan_to_num(features[col].to_numpy(dtype=np.float64))
+        if col not in string_vars:
+            compact[col] = scores.astype(np.uint8)
+        elif similarity=="uint8":
+            compact[col] = np.round(scores*255).astype(np.uint8)
+        else:
+            compact[col] = scores.astype(np.float16)
+    return compact
+
+def expand_features(compact, left_index, right_index=None, string_vars=[], similarity="float16", names=None):
+    '''
+        Translate a compact comparison matrix (see 'compact_features') back to float64 scores
+        indexed by the pairs of IDs.
+
+        Args:
+        -----
+            compact:
+                pandas.DataFrame.
+            left_index:
+                pandas.Index. IDs of the left database.
+            right_index:
+                pandas.Index. Default None (deduplication). IDs of the right database.
+            string_vars:
+                List. Score columns holding similarities (the 'string' rules).
+            similarity:
+                String. {'float16', 'uint8'}. Storage of the similarity scores.
+            names:
+                List. Default None. Names of the levels of the MultiIndex.
+        Return:
+        -------
+            features:
+                pandas.DataFrame.
+    '''
+    if right_index is None:
+        right_index = left_index
+    pairs = pd.MultiIndex.from_arrays([left_index[compact["left_pos"].to_numpy()], 
+                                       right_index[compact["right_pos"].to_numpy()]], names=names)
+    features = pd.DataFrame(index=pairs)
+    for col in compact.columns.drop(["left_pos", "right_pos"]):
+        scores = compact[col].to_numpy().astype(np.float64)
+        if col in string_vars and similarity=="uint8":
+            scores = scores/255
+        features[col] = scores
+    return features
+
+def compute_features_from_store(compare_cl, candidate_links, left_store, left_positions, right_store=None, right_positions=None, 
+                                cascade=None):
+    '''
+        Same as 'compute_features', but the records are taken from the memory-mapped record
+        stores (see 'write_record_store') instead of being received by the worker.
+
+        Args:
+        -----
+            compare_cl:
+                recordlinkage.Compare. Comparison rules (see 'MatchingBase.set_linkage').
+            candidate_links:
+                pandas.MultiIndex. Pairs of records to be compared.
+            left_store:
+                String. Path of the record store of the left database.
+            left_positions:
+                numpy.array. Positions of the left records needed by the pairs.
+            right_store:
+                String. Default None (deduplication). Path of the record store of the right database.
+            right_positions:
+                numpy.array. Default None. Positions of the right records needed by the pairs.
+            cascade:
+                Dictionary. Default None. Cascaded comparison settings (see 'compute_features').
+        Return:
+        -------
+            features:
+                pandas.DataFrame. Comparison matrix of the candidate pairs.
+    '''
+    left_df = read_record_store(left_store, left_positions)
+    right_df = None
+    if right_store is not None:
+        right_df = read_record_store(right_store, right_positions)
+    return compute_features(compare_cl, candidate_links, left_df, right_df, cascade)
+
+def translate_ids(keys, id_map):
+    '''
+        Translate integer surrogate keys back to the original identifiers of the records.
+
+        Args:
+        -----
+            keys:
+                numpy.array or list. Integer surrogate keys ('SURROGATE_ID').
+            id_map:
+                pandas.DataFrame. Mapping table created along with the surrogate keys (the 
+                'id_map' of the data objects), with columns 'SURROGATE_ID' and the original ID.
+        Return:
+        -------
+            ids:
+                numpy.array. Original identifiers.
+    '''
+    original = id_map.columns.drop("SURROGATE_ID")[0]
+    # --> Surrogate keys are dense (0, ..., n-1), so the translation is a positional take.
+    lookup = id_map.sort_values("SURROGATE_ID")[original].to_numpy()
+    keys = np.asarray(keys, dtype=np.int64)
+    if ((keys<0) | (keys>=lookup.shape[0])).any():
+        raise KeyError("Surrogate keys not found in the mapping table.")
+    return lookup[keys]
 
 '''
     -------------------------------------------------
@@ -135,9 +737,11 @@ def show_pair(pairs, left_df, right_df=None,
 '''
 
 def create_json_pairs(left_df, right_df, left_cols, right_cols, list_of_pairs, 
-                      classification="", duplicate_text_default="", rec_max=None):
+                      classification="", duplicate_text_default="", rec_max=None, left_ids=None, right_ids=None,
+                      first_cod=1):
     '''
-        Description.
+        Create the annotation records of the given pairs. Columns are projected once and 
+        the records of all pairs are gathered in bulk.
 
         Args:
         -----
@@ -150,52 +754,191 @@ def create_json_pairs(left_df, right_df, left_cols, right_cols, list_of_pairs,
             right_cols:
                 List.
             list_of_pairs:
-                List.
+                List (or iterable) of 2-tuples, or pandas.MultiIndex. Pairs of record keys.
+            classification:
+                String.
             duplicate_text_default:
                 String.
             rec_max:
                 Integer. Default None.
+            left_ids:
+                numpy.array. Default None. Original identifiers of the left records, indexed by
+                their integer surrogate keys (see 'translate_ids'), used in the 'identifiers' field.
+            right_ids:
+                numpy.array. Default None. Same as 'left_ids' for the right records.
+            first_cod:
+                Integer. Default 1. Value of the 'cod' field of the first pair.
         Return:
         -------
             object_list:
                 List.
     ''' 
-    count = 0
-    object_list = []
-    for row in list_of_pairs:
-        count+=1
-        pair = row
-    
-        left_pair = left_df[left_cols].loc[pair[0]].to_dict()
-        if right_df is not None:
-            # --> Signal for linkage
-            right_pair = right_df[right_cols].loc[pair[1]].to_dict()
-        else:
-            # --> Signal for deduplication
-            right_pair = left_df[left_cols].loc[pair[1]].to_dict() 
-            
-        pair_element = {"cod": count,
-                        "a": left_pair, "b": right_pair, 
-                        "identifiers": {"a": pair[0], "b": pair[1]}, 
-                        "classification": classification,
-                        "duplicate": duplicate_text_default,
-                        "keep": "a" }
-        object_list.append(pair_element)
-        #pair_element = -1
-        if rec_max is not None and count==rec_max:
-            break
+    # --> Pairs as two arrays of keys (only the first 'rec_max' pairs are exported).
+    if isinstance(list_of_pairs, pd.MultiIndex):
+        list_of_pairs = list_of_pairs[:rec_max]
+        left_keys, right_keys = list_of_pairs.get_level_values(0), list_of_pairs.get_level_values(1)
+    else:
+        pairs = list(islice(iter(list_of_pairs), rec_max))
+        if len(pairs)==0:
+            return []
+        left_keys, right_keys = [ pair[0] for pair in pairs ], [ pair[1] for pair in pairs ]
+
+    if right_df is None:
+        # --> Signal for deduplication
+        right_df, right_cols = left_df, left_cols
+
+    # --> Project the columns once and gather all the records with a single take.
+    left_pos, right_pos = left_df.index.get_indexer(left_keys), right_df.index.get_indexer(right_keys)
+    if (left_pos==-1).any() or (right_pos==-1).any():
+        raise KeyError("Pairs contain records not found in the databases.")
+    left_records = left_df[left_cols].iloc[left_pos].to_dict("records")
+    right_records = right_df[right_cols].iloc[right_pos].to_dict("records")
 
+    if left_ids is not None:
+        left_keys = left_ids[np.asarray(left_keys)]
+    if right_ids is not None:
+        right_keys = right_ids[np.asarray(right_keys)]
+    left_keys, right_keys = pd.Index(left_keys).tolist(), pd.Index(right_keys).tolist()
+
+    object_list = [ {"cod": count,
+                     "a": left_pair, "b": right_pair,
+                     "identifiers": {"a": left_key, "b": right_key},
+                     "classification": classification,
+                     "duplicate": duplicate_text_default,
+                     "keep": "a" } for count, (left_pair, right_pair, left_key, right_key) in enumerate(zip(left_records, right_records, left_keys, right_keys), start=first_cod) ]
     return object_list
 
+def iter_json_pairs(left_df, right_df, left_cols, right_cols, list_of_pairs, batch_size=10000, rec_max=None, **kwargs):
+    '''
+        Generator version of 'create_json_pairs': the annotation records are created in batches
+        of 'batch_size' pairs and yielded one at a time, so the whole list is never held in memory.
+
+        Args:
+        -----
+            list_of_pairs:
+                List (or iterable) of 2-tuples, or pandas.MultiIndex. Pairs of record keys.
+            batch_size:
+                Integer. Default 10000. Number of pairs processed at once.
+            rec_max:
+                Integer. Default None. Maximum number of pairs.
+            Remaining arguments as in 'create_json_pairs'.
+        Return:
+        -------
+            pair_element:
+                Dictionary. Annotation record of each pair.
+    '''
+    if isinstance(list_of_pairs, pd.MultiIndex):
+        list_of_pairs = list_of_pairs[:rec_max]
+        batches = ( list_of_pairs[start:start+batch_size] for start in range(0, len(list_of_pairs), batch_size) )
+    else:
+        pairs_iter = islice(iter(list_of_pairs), rec_max)
+        batches = iter(lambda: list(islice(pairs_iter, batch_size)), [])
+
+    count = 1
+    for batch in batches:
+        object_list = create_json_pairs(left_df, right_df, left_cols, right_cols, batch, first_cod=count, **kwargs)
+        count += len(object_list)
+        yield from object_list
 
-def find_root(index, ptr):
-    dummy = index
-    while ptr[dummy]>=0:
-        dummy = ptr[dummy]
-    return dummy
+
+def reservoir_sample(pairs, k, random_state=None):
+    '''
+        Uniform sample (without replacement) of 'k' pairs, drawn in a single pass over the pairs. 
+        Iterators are sampled through reservoir sampling (Algorithm L), so the pairs are never
+        materialised. Sized collections (list, numpy.array, pandas.MultiIndex) are sampled 
+        directly by position.
+
+        Args:
+        -----
+            pairs:
+                Iterable of pairs (iterator, list, numpy.array or pandas.MultiIndex).
+            k:
+                Integer. Sample size.
+            random_state:
+                Integer. Default None. Seed of the sampling.
+        Return:
+        -------
+            sample:
+                List or same type of 'pairs' (when sized). Sampled pairs, in the order they 
+                appear in 'pairs'.
+    '''
+    rng = np.random.default_rng(random_state)
+
+    if hasattr(pairs, "__len__") and hasattr(pairs, "__getitem__"):
+        if len(pairs)<=k:
+            return pairs
+        positions = np.sort(rng.choice(len(pairs), size=k, replace=False))
+        if isinstance(pairs, list):
+            return [ pairs[pos] for pos in positions ]
+        return pairs[positions]
+
+    pairs = iter(pairs)
+    reservoir = list(islice(pairs, k))
+    positions = list(range(len(reservoir)))
+    if len(reservoir)<k or k==0:
+        return reservoir
+
+    # --> Algorithm L: jump directly over the pairs that are not selected.
+    weight = np.exp(np.log(rng.random())/k)
+    current = k-1
+    while True:
+        skip = int(np.floor(np.log(rng.random())/np.log1p(-weight)))
+        pair = next(islice(pairs, skip, None), None)
+        if pair is None:
+            break
+        current += skip+1
+        slot = rng.integers(k)
+        reservoir[slot], positions[slot] = pair, current
+        weight *= np.exp(np.log(rng.random())/k)
+    return [ reservoir[slot] for slot in np.argsort(positions) ]
+
+def connected_components(left_ids, right_ids):
+    '''
+        Vectorised connected components over the graph of matched pairs.
+
+        IDs are factorized into integer positions (order of appearance) and the components are 
+        resolved with an array-based union-find: at each round, the root of every edge endpoint 
+        is hooked to the smallest root of the edge, and then the parent array is compressed 
+        by pointer jumping until every record points directly to its root. The root of each 
+        component is its first ID appearing in the pairs.
+
+        Args:
+        -----
+            left_ids:
+                numpy.array. IDs of the left records of the pairs.
+            right_ids:
+                numpy.array. IDs of the right records of the pairs.
+        Return:
+        -------
+            unique_ids:
+                numpy.array. Unique IDs found in the pairs.
+            labels:
+                numpy.array. Position (in 'unique_ids') of the root of the component of each ID.
+    '''
+    codes, unique_ids = pd.factorize(np.concatenate([np.asarray(left_ids), np.asarray(right_ids)]))
+    unique_ids = np.asarray(unique_ids)
+    left_codes, right_codes = codes[:len(left_ids)], codes[len(left_ids):]
+
+    labels = np.arange(unique_ids.shape[0])
+    while True:
+        # --> Hook the roots of both ends of each pair to the smallest one.
+        left_roots, right_roots = labels[left_codes], labels[right_codes]
+        if (left_roots==right_roots).all():
+            break
+        min_roots = np.minimum(left_roots, right_roots)
+        np.minimum.at(labels, left_roots, min_roots)
+        np.minimum.at(labels, right_roots, min_roots)
+
+        # --> Path compression (pointer jumping).
+        while True:
+            parents = labels[labels]
+            if (parents==labels).all():
+                break
+            labels = parents
+    return unique_ids, labels
 
 # --> Deduplication
-def deduple_grouping(pairs):
+def deduple_grouping(pairs, output="dict"):
     '''
         Perform grouping of matched records into a final schema file, identifying unique individuals.
 
@@ -203,60 +946,167 @@ def deduple_grouping(pairs):
         matched records), to create a hash/dictionary structure associating a given record to all its matched
         records (same person). Dictionary contains a list of matched records.
 
+        Components are resolved by 'connected_components' (vectorised union-find). The groups
+        have the same members as the previous union-by-size grouping, but each group is keyed
+        by its first ID appearing in 'pairs' (not by the root of the largest tree).
+
         Args:
         -----
             pairs:
                 pandas.DataFrame. A dataframe containing at least two columns representing
                 the matched pairs of unique records: "left" and "right".  
+            output:
+                String. {'dict', 'arrays'}. Default 'dict'. 'arrays' returns the cluster labels
+                as arrays instead of the dictionary.
         Return:
         -------
             matched_records:
-                collections.defaultdict. 
-    '''
-    left_nots = pairs["left_id"].tolist()
-    right_nots = pairs["right_id"].tolist()
-
-    # --> Define data structure of trees to aggregate several matched files through transitive relations. 
-    # ----> Unique records in 'pairs'
-    unique_nots = np.unique(left_nots+right_nots) 
-    # ----> Tree positions of each unique record of 'pairs' (based on the union/find algorithms)
-    ptr = np.zeros(unique_nots.shape[0], int) - 1
-    # ----> Associate each record to its position in 'ptr' (hash)
-    ptr_index = dict( zip(unique_nots, np.arange(0, unique_nots.shape[0], 1)) )
-
-    # --> Aggregate matched records associating each unique person to a root index. 
-    for index in tqdm(range(len(left_nots))):
-        left = left_nots[index]
-        right = right_nots[index]
-        left_index = ptr_index[left]
-        right_index = ptr_index[right]
-    
-        left_root = find_root(left_index, ptr)
-        right_root = find_root(right_index, ptr)
-    
-        if left_root==right_root:
-            continue
-    
-        bigger_root, bigger_index = left_root, left_index
-        smaller_root, smaller_index = right_root, right_index
-        if ptr[right_root]<ptr[left_root]:
-            bigger_root, bigger_index = right_root, right_index
-            smaller_root, smaller_index = left_root, left_index
-    
-        ptr[bigger_root] += ptr[smaller_root]
-        ptr[smaller_root] = bigger_root
-        
-    matched_records = defaultdict(lambda: [])
-    for index in range(len(ptr)):
-        local_not = unique_nots[index]
-        root_not = unique_nots[find_root(index, ptr)]
-        if root_not!=local_not:
-            matched_records[root_not].append(local_not)
+                collections.defaultdict. Root record of each group associated to the list of the
+                other records of the group. When output='arrays', a 2-tuple of numpy.array (record 
+                IDs, root ID of the group of each record).
+    '''
+    unique_nots, labels = connected_components(pairs["left_id"].to_numpy(), pairs["right_id"].to_numpy())
+    if output=="arrays":
+        return unique_nots, unique_nots[labels]
 
+    return grouping_view(unique_nots, labels)
+
+def grouping_view(unique_ids, labels):
+    '''
+        Dictionary view of the groups of records: the root of each group associated to the list 
+        of the other records of the group (records alone in their group are not included).
+
+        Args:
+        -----
+            unique_ids:
+                numpy.array. IDs of the records.
+            labels:
+                numpy.array. Position (in 'unique_ids') of the root of the group of each record.
+        Return:
+        -------
+            matched_records:
+                collections.defaultdict.
+    '''
+    members = np.flatnonzero(labels!=np.arange(labels.shape[0]))
+    members = members[np.argsort(labels[members], kind="stable")]
+    roots, starts = np.unique(labels[members], return_index=True)
+
+    matched_records = defaultdict(lambda: [])
+    for root, group in zip(unique_ids[roots].tolist(), np.split(unique_ids[members], starts[1:])):
+        matched_records[root] = group.tolist()
     return matched_records
 
+def golden_records(df, unique_ids, roots, rules, date_col="DT_NOTIFIC", validators=None):
+    '''
+        Consolidate each group of matched records into a single record (one row per person),
+        following a survivorship rule for each field. All rules are computed through grouped
+        operations over the whole database.
+
+        Survivorship rules:
+            - 'most_frequent': most frequent non-missing value of the group (ties are broken 
+              by the most recent record);
+            - 'most_recent': non-missing value of the most recent record of the group, according
+              to 'date_col';
+            - 'first_valid': first valid value of the group (oldest record first, according to
+              'date_col'). Validators are given by 'validators'.
+
+        Args:
+        -----
+            df:
+                pandas.DataFrame. Processed database, indexed by the IDs of the records.
+            unique_ids:
+                numpy.array. IDs of the grouped records (see 'deduple_grouping' with output='arrays').
+            roots:
+                numpy.array. ID of the root of the group of each record of 'unique_ids'. Records
+                of 'df' not present in 'unique_ids' are kept as single persons.
+            rules:
+                dictionary. Survivorship rule of each field: {field: rule}.
+            date_col:
+                String. Default 'DT_NOTIFIC'. Date field used to order the records of each group.
+            validators:
+                dictionary. Default None. Bulk validator of each 'first_valid' field: {field: function}
+                (see 'valid_keys'). When None, the CNS and CPF validators are used for the fields 
+                "cns" and "cpf".
+        Return:
+        -------
+            persons:
+                pandas.DataFrame. One row per person, indexed by the root ID of each group.
+    '''
+    if validators is None:
+        validators = {"cns": general_utils.cns_valid_mask, "cpf": general_utils.cpf_valid_mask}
+
+    # --> Group of each record (records out of any group are their own root).
+    person = pd.Series(roots, index=unique_ids).reindex(df.index)
+    person = person.where(person.notna(), df.index.to_series())
+    person_codes, person_ids = pd.factorize(person, sort=True)
+
+    # --> Records ordered by group and, inside the group, by date (records without date last).
+    dates = pd.to_datetime(df[date_col], errors="coerce").to_numpy() if date_col is not None else pd.NaT
+    records = pd.DataFrame({"person": person_codes, "date": dates, "position": np.arange(df.shape[0])})
+    newest_first = records.sort_values(["person", "date", "position"], ascending=[True, False, True], na_position="last")["position"].to_numpy()
+    oldest_first = records.sort_values(["person", "date", "position"], ascending=[True, True, True], na_position="last")["position"].to_numpy()
+
+    persons = pd.DataFrame(index=pd.Index(person_ids, name=df.index.name))
+    for col, rule in rules.items():
+        order = oldest_first if rule=="first_valid" else newest_first
+        values = df[col].iloc[order].reset_index(drop=True)
+        sorted_codes = person_codes[order]
+        if rule=="most_recent":
+            consolidated = values.groupby(sorted_codes).first()
+        elif rule=="first_valid":
+            consolidated = valid_keys(values, validators.get(col)).groupby(sorted_codes).first()
+        elif rule=="most_frequent":
+            counts = pd.DataFrame({"person": sorted_codes, "value": values, "rank": np.arange(len(values))}).dropna(subset=["value"])
+            counts = counts.groupby(["person", "value"], sort=False).agg(n=("rank", "size"), rank=("rank", "min")).reset_index()
+            counts = counts.sort_values(["person", "n", "rank"], ascending=[True, False, True], kind="stable").drop_duplicates("person")
+            consolidated = pd.Series(counts["value"].to_numpy(), index=counts["person"].to_numpy())
+        else:
+            raise Exception(f"Survivorship rule '{rule}' not recognized.")
+        persons[col] = consolidated.reindex(np.arange(len(person_ids))).to_numpy()
+    return persons
+
 # --> Linkage
-def linkage_grouping(pairs):
+class LinkageGroups(Mapping):
+    '''
+        Compressed sparse-row (CSR) layout of the linkage groups: the matched records of 
+        'keys_[i]' are 'values_[offsets[i]:offsets[i+1]]'. Behaves as a read-only dictionary 
+        whose lists are only built on demand.
+
+        Args:
+        -----
+            keys:
+                numpy.array. Sorted unique left records.
+            offsets:
+                numpy.array. Start of the matched records of each key ('len(keys)+1' entries).
+            values:
+                numpy.array. Matched right records, sorted within each key.
+    '''
+    def __init__(self, keys, offsets, values) -> None:
+        self.keys_ = keys
+        self.offsets = offsets
+        self.values_ = values
+        self._position = None
+
+    def __getitem__(self, key):
+        if self._position is None:
+            self._position = pd.Index(self.keys_)
+        pos = self._position.get_loc(key)
+        return self.values_[self.offsets[pos]:self.offsets[pos+1]].tolist()
+
+    def __iter__(self):
+        return iter(self.keys_.tolist())
+
+    def __len__(self):
+        return self.keys_.shape[0]
+
+    def to_dict(self):
+        '''
+            Materialize the dictionary of lists.
+        '''
+        groups = np.split(self.values_, self.offsets[1:-1])
+        return { k: v.tolist() for k, v in zip(self.keys_.tolist(), groups) }
+
+def linkage_grouping(pairs, output="dict"):
     '''
         Perform grouping of matched records into a final schema file, identifying unique individuals.
 
@@ -269,11 +1119,27 @@ def linkage_grouping(pairs):
             pairs:
                 pandas.DataFrame. A dataframe containing at least two columns representing
                 the matched pairs of unique records: "left" and "right".  
+            output:
+                String. {'dict', 'csr'}. Default 'dict'. 'csr' returns a 'LinkageGroups' object 
+                holding the groups as NumPy arrays (sorted left keys, offsets and right keys).
         Return:
         -------
             result:
-                collections.defaultdict. 
+                collections.defaultdict. When output='csr', a LinkageGroups object.
     '''
+    if output=="csr":
+        # --> Pairs with a missing ID are dropped (as by 'groupby' in the dictionary output).
+        pairs = pairs[pairs["left"].notna() & pairs["right"].notna()]
+        left_codes, left_uniques = pd.factorize(pairs["left"], sort=True)
+        right_codes, right_uniques = pd.factorize(pairs["right"], sort=True)
+        # --> Unique (left, right) pairs, sorted by left and then by right.
+        links = np.unique(left_codes.astype(np.int64)*len(right_uniques) + right_codes)
+        links_left, links_right = np.divmod(links, len(right_uniques))
+
+        offsets = np.zeros(len(left_uniques)+1, dtype=np.int64)
+        np.cumsum(np.bincount(links_left, minlength=len(left_uniques)), out=offsets[1:])
+        return LinkageGroups(np.asarray(left_uniques), offsets, np.asarray(right_uniques)[links_right])
+
     pairs_t = list(pairs.groupby("left")["right"].value_counts().index)
     result = {}
     for k, v in pairs_t:
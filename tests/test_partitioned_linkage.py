@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from context import linkage_saude
+import linkage_saude.utils.matching as matching_utils
+from linkage_saude.matching.MatchingData import Deduple
+
+def records():
+    return pd.DataFrame({
+        "id": list("abcdef"), "uniq": list("uvwxyz"), "blk": ["1", "1", "2", "2", "3", "3"],
+        "sexo": ["F", "F", "M", "F", "M", "M"], "nome": ["ANA", "ANA", "JOSE", "JOSE", "LUIS", "LUIZ"],
+    })
+
+def test_cascade_with_chunksize(tmp_path):
+    # --> The partition of block '2' is empty after the cascade (mismatched 'sexo').
+    deduple = Deduple(records(), left_id="id", env_folder=str(tmp_path))
+    deduple.set_linkage({"sexo": ["exact"], "nome": ["string", 0.8]}, cascade_score=2)
+    deduple.perform_linkage("blk", chunksize=2)
+
+    features = pd.concat(list(deduple.iter_comparison_matrix()))
+    assert sorted(features.index.tolist())==[("b", "a"), ("f", "e")]
+    assert features["sexo"].tolist()==[1, 1]
+
+def test_run_without_pairs_replaces_scores(tmp_path):
+    deduple = Deduple(records(), left_id="id", env_folder=str(tmp_path))
+    deduple.set_linkage({"sexo": ["exact"], "nome": ["string", 0.8]})
+    deduple.perform_linkage("blk", chunksize=2)
+    assert len(list(deduple.iter_comparison_matrix()))
+
+    # --> Unique blocking keys: no pairs, and no scores of the previous run.
+    deduple.perform_linkage("uniq", chunksize=2)
+    assert list(deduple.iter_comparison_matrix())==[]
+
+def test_partitions_exclude_missing_keys():
+    df = records().set_index("id")
+    df.loc[["c", "d"], "blk"] = None
+    rules = matching_utils.blocking_rules("blk", 3)
+    for _, left_positions, _ in matching_utils.partitioned_candidates(rules, 1, df[["blk"]]):
+        assert not df["blk"].iloc[left_positions].isna().any()
+
+def test_linkage_partitions_exclude_missing_keys():
+    left, right = records().set_index("id"), records().set_index("id")
+    left.loc[["c", "d"], "blk"] = None
+    rules = matching_utils.blocking_rules("blk", 3)
+    for _, left_positions, _ in matching_utils.partitioned_candidates(rules, 1, left[["blk"]], right[["blk"]]):
+        assert not left["blk"].iloc[left_positions].isna().any()